@@ -0,0 +1,167 @@
+# Reusable Cortex agent specifications
+# An AgentSpec holds an agent definition (models, orchestration, instructions,
+# tools, tool_resources, ...) loaded from a dict, JSON or YAML file. It is
+# validated once and serialized once; per-call request bodies only encode the
+# messages (or the agent name) and splice them onto the cached bytes
+
+import copy
+import hashlib
+import json
+
+try:
+    import yaml
+except ImportError:
+    # Optional: only needed for AgentSpec.from_file on .yaml/.yml files
+    yaml = None
+
+# Top-level fields accepted by the inline agent:run endpoint
+RUN_FIELDS = ("models", "experimental", "orchestration", "instructions", "tools",
+              "tool_resources", "tool_choice")
+
+# Resource keys each built-in tool type needs in tool_resources
+REQUIRED_TOOL_RESOURCES = {
+    "cortex_analyst_text_to_sql": ("semantic_view", "semantic_model_file"),
+    "cortex_search": ("search_service", "name"),
+}
+
+
+class AgentSpecError(ValueError):
+    """
+    Raised when an agent specification is invalid
+    """
+
+
+def _encode(value):
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def _splice(prefix, field, value):
+    # Append `"field": value` to the cached encoding of an object missing its closing brace
+    separator = b"," if len(prefix) > 1 else b""
+    return prefix + separator + _encode(field) + b":" + _encode(value) + b"}"
+
+
+class AgentSpec:
+    """
+    A validated agent definition with cached JSON encodings
+
+    Args:
+        definition: Agent definition dict; an optional "name" is used as the
+            default agent name for create/update
+    """
+
+    def __init__(self, definition):
+        if not isinstance(definition, dict):
+            raise AgentSpecError("Agent spec must be a JSON object")
+        definition = copy.deepcopy(definition)
+        self.name = definition.pop("name", None)
+        self._definition = definition
+        self.validate()
+
+        run_fields = {field: definition[field] for field in RUN_FIELDS if field in definition}
+        # Encodings without the closing brace so per-call fields can be appended
+        self._run_prefix = _encode(run_fields)[:-1]
+        self._definition_bytes = _encode(definition)
+        self._digest = hashlib.sha256(
+            json.dumps(definition, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        ).hexdigest()
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Load a spec from a .json, .yaml or .yml file
+        """
+        with open(path, encoding="utf-8") as f:
+            if path.endswith((".yaml", ".yml")):
+                if yaml is None:
+                    raise ImportError("PyYAML is required to load YAML agent specs (pip install pyyaml)")
+                return cls(yaml.safe_load(f))
+            return cls(json.load(f))
+
+    @property
+    def definition(self):
+        """
+        The definition without "name" (a copy; the spec itself is immutable)
+        """
+        return copy.deepcopy(self._definition)
+
+    def digest(self):
+        """
+        Stable SHA-256 of the definition, independent of key order
+        """
+        return self._digest
+
+    def validate(self):
+        """
+        Check the structure of the definition
+
+        Raises:
+            AgentSpecError: Describing the first problem found
+        """
+        definition = self._definition
+        for field in ("models", "orchestration", "instructions", "tool_resources", "experimental"):
+            if field in definition and not isinstance(definition[field], dict):
+                raise AgentSpecError(f"'{field}' must be an object")
+
+        orchestration_model = definition.get("models", {}).get("orchestration")
+        if orchestration_model is not None and not isinstance(orchestration_model, str):
+            raise AgentSpecError("'models.orchestration' must be a string")
+
+        budget = definition.get("orchestration", {}).get("budget", {})
+        if not isinstance(budget, dict):
+            raise AgentSpecError("'orchestration.budget' must be an object")
+        for key in ("seconds", "tokens"):
+            value = budget.get(key)
+            # bool is an int subclass, so True would otherwise pass as 1
+            if value is not None and (isinstance(value, bool) or not isinstance(value, int) or value <= 0):
+                raise AgentSpecError(f"'orchestration.budget.{key}' must be a positive integer")
+
+        tools = definition.get("tools", [])
+        if not isinstance(tools, list):
+            raise AgentSpecError("'tools' must be a list")
+        tool_types = {}
+        for index, tool in enumerate(tools):
+            tool_spec = tool.get("tool_spec") if isinstance(tool, dict) else None
+            if not isinstance(tool_spec, dict) or not tool_spec.get("name") or not tool_spec.get("type"):
+                raise AgentSpecError(f"tools[{index}] needs a tool_spec with a name and type")
+            if tool_spec["name"] in tool_types:
+                raise AgentSpecError(f"Duplicate tool name '{tool_spec['name']}'")
+            tool_types[tool_spec["name"]] = tool_spec["type"]
+
+        tool_resources = definition.get("tool_resources", {})
+        for name, resources in tool_resources.items():
+            if name not in tool_types:
+                raise AgentSpecError(f"tool_resources has an entry for unknown tool '{name}'")
+            if not isinstance(resources, dict):
+                raise AgentSpecError(f"tool_resources['{name}'] must be an object")
+        for name, tool_type in tool_types.items():
+            required = REQUIRED_TOOL_RESOURCES.get(tool_type)
+            if required and not any(tool_resources.get(name, {}).get(key) for key in required):
+                raise AgentSpecError(f"Tool '{name}' ({tool_type}) needs one of {', '.join(required)} "
+                                     f"in tool_resources")
+
+    def run_payload(self, messages):
+        """
+        Return the inline agent:run body as a dict (shares the spec's nested objects)
+        """
+        payload = {field: self._definition[field] for field in RUN_FIELDS if field in self._definition}
+        payload["messages"] = messages
+        return payload
+
+    def run_body(self, messages):
+        """
+        Return the encoded inline agent:run body; only `messages` is serialized per call
+        """
+        return _splice(self._run_prefix, "messages", messages)
+
+    def definition_body(self, name=None):
+        """
+        Return the encoded body for creating or updating the agent as `name`
+        """
+        name = name or self.name
+        if name is None:
+            raise AgentSpecError("An agent name is required to create or update an agent")
+        name_prefix = _encode({"name": name})[:-1]
+        if self._definition_bytes == b"{}":
+            return name_prefix + b"}"
+        return name_prefix + b"," + self._definition_bytes[1:]
@@ -0,0 +1,244 @@
+# asyncio client for the Snowflake Cortex Agent and Analyst streaming APIs
+# A single event loop can drive many concurrent agent runs: each call returns
+# an async iterator of SSEEvent objects decoded incrementally from the socket
+
+import asyncio
+import contextlib
+
+import aiohttp
+
+from cortex_client import CortexAPIError, RetryPolicy
+from cortex_sse import SSEDecoder
+from run_cortex_agent_with_agent import build_agent_object_request, build_agent_history_request
+from run_cortex_agent_without_agent_creation import build_cortex_agent_request
+from run_cortex_analyst import build_analyst_message_request
+
+
+class AsyncCortexClient:
+    """
+    Async client sharing one aiohttp connection pool across all requests
+
+    Args:
+        limit: Maximum number of simultaneous connections
+        limit_per_host: Maximum number of simultaneous connections per account host (0 = no limit)
+        timeout: Total timeout in seconds for a single request (None = no timeout)
+        keepalive_timeout: Seconds an idle connection is kept in the pool
+        retry_policy: Optional RetryPolicy for 429/503 responses (defaults to RetryPolicy())
+        limiter: Optional RequestLimiter, which may be shared with a CortexClient
+    """
+
+    def __init__(self, limit=100, limit_per_host=0, timeout=None, keepalive_timeout=30,
+                 retry_policy=None, limiter=None):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.keepalive_timeout = keepalive_timeout
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.limiter = limiter
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def stream_events(self, api_endpoint, headers, payload):
+        """
+        POST a request and yield SSEEvent objects as they arrive
+
+        Args:
+            api_endpoint: Full request URL
+            headers: Request headers
+            payload: JSON request body
+
+        Rate-limited and unavailable responses are retried according to retry_policy.
+        A caller that may stop iterating early should wrap the iterator in
+        contextlib.aclosing(...), so the connection and limiter slot are released
+        right away instead of whenever the generator is garbage collected.
+
+        Raises:
+            CortexAPIError: If the endpoint responds with a non-200 status
+        """
+        session = self._get_session()
+        if self.limiter is not None:
+            await self.limiter.acquire_async(api_endpoint)
+        try:
+            attempt = 0
+            while True:
+                response = await session.post(api_endpoint, headers=headers, json=payload)
+                if not self.retry_policy.should_retry("POST", response.status, attempt):
+                    break
+                delay = self.retry_policy.delay(attempt, response.headers.get("Retry-After"))
+                response.release()
+                await asyncio.sleep(delay)
+                attempt += 1
+
+            async with response:
+                if response.status != 200:
+                    raise CortexAPIError(response.status, await response.text())
+
+                decoder = SSEDecoder()
+                async for chunk in response.content.iter_any():
+                    for event in decoder.feed(chunk):
+                        yield event
+                decoder.close()
+        finally:
+            if self.limiter is not None:
+                self.limiter.release(api_endpoint)
+
+    def run_agent_object(self, token, agent_name, user_message, database, schema,
+                         account_url, thread_id=None, parent_message_id=None, tool_choice=None):
+        """
+        Run an existing Cortex agent object and stream its events
+
+        Args:
+            token: Bearer token for authentication
+            agent_name: Name of the existing agent to run
+            user_message: The user's query/message to send to the agent
+            database: Database name where the agent is stored
+            schema: Schema name where the agent is stored
+            account_url: Snowflake account URL
+            thread_id: Optional thread ID for conversation continuity
+            parent_message_id: Optional parent message ID (required if thread_id is provided)
+            tool_choice: Optional tool choice configuration
+        """
+        api_endpoint, headers, payload = build_agent_object_request(
+            token, agent_name, user_message, database, schema, account_url,
+            thread_id=thread_id, parent_message_id=parent_message_id, tool_choice=tool_choice
+        )
+        return self.stream_events(api_endpoint, headers, payload)
+
+    def run_agent_object_with_conversation_history(self, token, agent_name, conversation_history,
+                                                   database, schema, account_url, tool_choice=None):
+        """
+        Run an existing Cortex agent object with full conversation history and stream its events
+
+        Args:
+            token: Bearer token for authentication
+            agent_name: Name of the existing agent to run
+            conversation_history: List of messages in the conversation
+            database: Database name where the agent is stored
+            schema: Schema name where the agent is stored
+            account_url: Snowflake account URL
+            tool_choice: Optional tool choice configuration
+        """
+        api_endpoint, headers, payload = build_agent_history_request(
+            token, agent_name, conversation_history, database, schema, account_url,
+            tool_choice=tool_choice
+        )
+        return self.stream_events(api_endpoint, headers, payload)
+
+    def run_cortex_agent(self, token, user_message, account_url, semantic_view,
+                         search_service, warehouse="HOL2_WH"):
+        """
+        Run a Cortex agent without creating an agent object and stream its events
+
+        Args:
+            token: Bearer token for authentication
+            user_message: The user's query/message to send to the agent
+            account_url: Snowflake account URL
+            semantic_view: Path to the semantic view for the analyst tool
+            search_service: Path to the search service
+            warehouse: Warehouse name
+        """
+        api_endpoint, headers, payload = build_cortex_agent_request(
+            token, user_message, account_url, semantic_view, search_service,
+            warehouse=warehouse
+        )
+        return self.stream_events(api_endpoint, headers, payload)
+
+    def send_analyst_message(self, token, question, account_url, semantic_model_file=None,
+                             semantic_view=None, semantic_model_spec=None,
+                             conversation_history=None):
+        """
+        Send a streaming message to Cortex Analyst and stream its events
+
+        Args:
+            token: Bearer token for authentication
+            question: The user's natural language question
+            account_url: Snowflake account URL
+            semantic_model_file: Path to YAML file on stage (e.g., "@stage/model.yaml")
+            semantic_view: Name of semantic view (e.g., "db.schema.view")
+            semantic_model_spec: Direct YAML specification as string
+            conversation_history: List of previous messages for multi-turn conversation
+        """
+        api_endpoint, headers, payload = build_analyst_message_request(
+            token, question, account_url, semantic_model_file=semantic_model_file,
+            semantic_view=semantic_view, semantic_model_spec=semantic_model_spec,
+            stream=True, conversation_history=conversation_history
+        )
+        return self.stream_events(api_endpoint, headers, payload)
+
+
+async def collect_text(events):
+    """
+    Drain an agent event stream and return the concatenated response text
+
+    Args:
+        events: Async iterator returned by one of the AsyncCortexClient run methods
+    """
+    parts = []
+    # aclosing releases the connection as soon as we stop at 'done'
+    async with contextlib.aclosing(events):
+        async for event in events:
+            if event.event == 'response.text.delta':
+                parts.append(event.json().get('text', ''))
+            elif event.event == 'done':
+                break
+    return "".join(parts)
+
+
+# Example usage
+if __name__ == "__main__":
+    import os
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    token = os.getenv("SNOWFLAKE_TOKEN")
+    account_url = "https://eq06761.ap-southeast-2.snowflakecomputing.com"
+
+    questions = [
+        "What was the total revenue last quarter?",
+        "Which product line grew the fastest?",
+        "How many users have used our products?",
+    ]
+
+    async def main():
+        async with AsyncCortexClient(limit_per_host=50) as client:
+            runs = [
+                collect_text(client.run_agent_object(
+                    token=token,
+                    agent_name="custom_agent",
+                    user_message=question,
+                    database="HOL2_DB",
+                    schema="HOL2_SCHEMA",
+                    account_url=account_url
+                ))
+                for question in questions
+            ]
+            answers = await asyncio.gather(*runs, return_exceptions=True)
+            for question, answer in zip(questions, answers):
+                print(f"Q: {question}")
+                print(f"A: {answer}")
+                print("-" * 60)
+
+    asyncio.run(main())
@@ -0,0 +1,214 @@
+# Response cache for read-only Cortex REST calls (agent descriptions and listings)
+# An in-process LRU with a TTL, optionally backed by a directory of JSON files
+# so several processes share it. Stale entries are revalidated with ETag /
+# Last-Modified conditional requests, and writes invalidate the affected URLs
+
+import base64
+import collections
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def _path_of(url):
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
+
+
+class CacheEntry:
+    """
+    A cached 200 response
+
+    Args:
+        url: Full request URL (including the query string)
+        content: Response body bytes
+        headers: Response headers
+        stored_at: Wall-clock time the response was fetched or last revalidated
+    """
+
+    def __init__(self, url, content, headers, stored_at):
+        self.url = url
+        self.content = content
+        self.headers = dict(headers)
+        self.stored_at = stored_at
+
+    def conditional_headers(self):
+        """
+        Return If-None-Match / If-Modified-Since headers for revalidating this entry
+        """
+        headers = {}
+        headers_ci = CaseInsensitiveDict(self.headers)
+        if "ETag" in headers_ci:
+            headers["If-None-Match"] = headers_ci["ETag"]
+        if "Last-Modified" in headers_ci:
+            headers["If-Modified-Since"] = headers_ci["Last-Modified"]
+        return headers
+
+    def to_response(self, cache_status):
+        """
+        Rebuild a requests.Response; `cortex_cache` is "hit" or "revalidated"
+        """
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.url = self.url
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers) or "utf-8"
+        response._content = self.content
+        response.cortex_cache = cache_status
+        return response
+
+    def to_json(self):
+        return {
+            "url": self.url,
+            "content": base64.b64encode(self.content).decode("ascii"),
+            "headers": self.headers,
+            "stored_at": self.stored_at,
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data["url"], base64.b64decode(data["content"]), data["headers"], data["stored_at"])
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of GET responses used by CortexClient(cache=...)
+
+    Entries are keyed by URL, query parameters and the Authorization header,
+    so callers with different credentials never share entries. A successful
+    POST/PUT/DELETE/PATCH invalidates cached responses for the written URL and
+    its parent collection (e.g. updating .../agents/NAME drops the cached
+    description and the .../agents listing).
+
+    Args:
+        maxsize: Maximum number of entries kept in memory
+        ttl: Seconds an entry is served without contacting the server
+        directory: Optional directory for an on-disk copy shared across processes
+    """
+
+    def __init__(self, maxsize=256, ttl=300.0, directory=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.directory = directory
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def key(self, url, kwargs):
+        """
+        Return the cache key for a GET request sent with requests keyword arguments
+        """
+        prepared = requests.Request("GET", url, params=kwargs.get("params")).prepare()
+        headers = CaseInsensitiveDict(kwargs.get("headers") or {})
+        return prepared.url, _digest(headers.get("Authorization", ""))
+
+    def _file(self, key):
+        return os.path.join(self.directory, f"{_digest(_path_of(key[0]))}-{_digest(key[0] + key[1])}.json")
+
+    def get(self, key):
+        """
+        Return (entry, fresh) for a key, or (None, False) if nothing is cached
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None and self.directory:
+            try:
+                with open(self._file(key), encoding="utf-8") as f:
+                    entry = CacheEntry.from_json(json.load(f))
+            except (OSError, ValueError, KeyError):
+                entry = None
+            if entry is not None:
+                self._remember(key, entry)
+        if entry is None:
+            return None, False
+        return entry, time.time() - entry.stored_at < self.ttl
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _write(self, key, entry):
+        if not self.directory:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry.to_json(), f)
+        os.replace(tmp_path, self._file(key))
+
+    def store(self, key, response):
+        """
+        Cache a 200 response and return the entry
+        """
+        entry = CacheEntry(key[0], response.content, response.headers, time.time())
+        self._remember(key, entry)
+        self._write(key, entry)
+        return entry
+
+    def touch(self, key, entry):
+        """
+        Mark an entry as fresh again after a 304 Not Modified
+        """
+        entry.stored_at = time.time()
+        self._write(key, entry)
+
+    def invalidate(self, url):
+        """
+        Drop cached responses for `url` and for its parent collection
+        """
+        path = _path_of(url)
+        paths = {path, path.rsplit("/", 1)[0]}
+        with self._lock:
+            for key in [key for key in self._entries if _path_of(key[0]) in paths]:
+                del self._entries[key]
+        if self.directory:
+            prefixes = tuple(f"{_digest(p)}-" for p in paths)
+            for name in os.listdir(self.directory):
+                if name.startswith(prefixes):
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except FileNotFoundError:
+                        pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.directory:
+            for name in os.listdir(self.directory):
+                if name.endswith(".json"):
+                    os.remove(os.path.join(self.directory, name))
+
+    def record(self, outcome):
+        """
+        Count a lookup outcome: "hits", "misses" or "revalidations"
+        """
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+        }
@@ -0,0 +1,658 @@
+# Shared HTTP client for the Snowflake Cortex REST APIs
+# Owns a keep-alive requests.Session so repeated calls reuse the same
+# TCP/TLS connection to the account URL instead of reconnecting every time
+
+import asyncio
+import collections
+import random
+import threading
+import time
+import weakref
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+# Per-thread accumulator for time spent opening sockets (TCP + TLS) during a request
+_connect_timing = threading.local()
+
+
+def _record_connect(seconds):
+    _connect_timing.seconds = getattr(_connect_timing, "seconds", 0.0) + seconds
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _record_connect(time.perf_counter() - start)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _record_connect(time.perf_counter() - start)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimingHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connections record how long connect (TCP + TLS) took
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+class CortexAPIError(Exception):
+    """
+    Raised when a Cortex endpoint returns a non-success HTTP status
+
+    Args:
+        status_code: HTTP status code returned by the endpoint
+        body: Response body text
+    """
+
+    def __init__(self, status_code, body):
+        super().__init__(f"Cortex API request failed with status {status_code}: {body}")
+        self.status_code = status_code
+        self.body = body
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter for rate-limited and unavailable responses
+
+    Args:
+        max_retries: Number of retries after the first attempt
+        backoff_factor: Base delay in seconds; attempt n waits up to backoff_factor * 2**n
+        max_backoff: Upper bound for a single delay, including Retry-After
+        status_forcelist: Statuses retried for idempotent methods (GET, PUT, DELETE, HEAD)
+        post_status_forcelist: Statuses retried for POST, where the request was
+            rejected before it was processed
+    """
+
+    IDEMPOTENT_METHODS = frozenset(["GET", "PUT", "DELETE", "HEAD", "OPTIONS"])
+
+    def __init__(self, max_retries=3, backoff_factor=0.5, max_backoff=30.0,
+                 status_forcelist=(429, 502, 503, 504), post_status_forcelist=(429, 503)):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.status_forcelist = frozenset(status_forcelist)
+        self.post_status_forcelist = frozenset(post_status_forcelist)
+
+    def should_retry(self, method, status_code, attempt):
+        if attempt >= self.max_retries:
+            return False
+        if method.upper() in self.IDEMPOTENT_METHODS:
+            return status_code in self.status_forcelist
+        return status_code in self.post_status_forcelist
+
+    def delay(self, attempt, retry_after=None):
+        """
+        Seconds to wait before retry number `attempt` (0-based)
+
+        Args:
+            attempt: Number of retries already made
+            retry_after: Optional Retry-After header value (seconds or HTTP date)
+        """
+        if retry_after:
+            seconds = None
+            if retry_after.strip().isdigit():
+                seconds = float(retry_after)
+            else:
+                try:
+                    seconds = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    pass
+            if seconds is not None:
+                return min(max(seconds, 0.0), self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * (2 ** attempt)))
+
+
+class CortexClient:
+    """
+    Pooled HTTP client shared by all Cortex API helpers
+
+    Args:
+        pool_connections: Number of per-host connection pools to cache
+        pool_maxsize: Maximum number of connections kept alive per host
+        max_retries: Number of retries for connection errors and retryable statuses
+        backoff_factor: Backoff factor between retries (seconds)
+        status_forcelist: HTTP status codes that trigger a retry on idempotent methods
+        pool_block: Block when the per-host pool is exhausted instead of opening extra connections
+        timeout: Default (connect, read) timeout applied to every request
+        retry_policy: Optional RetryPolicy for retryable statuses (built from the
+            arguments above by default)
+        limiter: Optional RequestLimiter applied to every request
+        cache: Optional ResponseCache for GET requests (agent descriptions and listings)
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, max_retries=3,
+                 backoff_factor=0.5, status_forcelist=(429, 502, 503, 504),
+                 pool_block=False, timeout=None, retry_policy=None, limiter=None,
+                 cache=None):
+        self.timeout = timeout
+        self.limiter = limiter
+        self.cache = cache
+        self.session = requests.Session()
+        self.retry_policy = retry_policy or RetryPolicy(
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=status_forcelist
+        )
+
+        # urllib3 only retries failed connection attempts, which is safe for
+        # every method; status retries are handled in request() by retry_policy
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=0,
+            status=0,
+            backoff_factor=backoff_factor,
+            raise_on_status=False
+        )
+        adapter = _TimingHTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=retry,
+            pool_block=pool_block
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a request through the pooled session
+
+        Retryable statuses are retried according to retry_policy. The returned
+        response carries a `cortex_timing` dict with `queued` (seconds spent
+        waiting on the limiter), `connect` (seconds spent opening new
+        connections, 0 when a pooled connection was reused), `headers` (seconds
+        until response headers arrived, including queueing and retries) and
+        `retries`.
+
+        With a cache, non-streamed GETs may be answered from it (the response
+        then has `cortex_cache` set to "hit", "revalidated" or "miss") and
+        successful writes invalidate the URLs they change.
+
+        Args:
+            method: HTTP method
+            url: Full request URL
+            **kwargs: Passed through to requests.Session.request
+        """
+        if self.timeout is not None:
+            kwargs.setdefault("timeout", self.timeout)
+        method = method.upper()
+        if self.cache is None:
+            return self._send(method, url, kwargs)
+        if method == "GET" and not kwargs.get("stream"):
+            return self._cached_get(url, kwargs)
+
+        response = self._send(method, url, kwargs)
+        # Action endpoints such as agents/NAME:run do not change cached resources
+        if (method in ("POST", "PUT", "DELETE", "PATCH") and 200 <= response.status_code < 300
+                and ":" not in urlparse(url).path.rsplit("/", 1)[-1]):
+            self.cache.invalidate(url)
+        return response
+
+    def _cached_get(self, url, kwargs):
+        start = time.perf_counter()
+        key = self.cache.key(url, kwargs)
+        entry, fresh = self.cache.get(key)
+        if fresh:
+            self.cache.record("hits")
+            response = entry.to_response("hit")
+            response.cortex_timing = {
+                "queued": 0.0,
+                "connect": 0.0,
+                "headers": time.perf_counter() - start,
+                "retries": 0,
+            }
+            return response
+
+        if entry is not None:
+            # Revalidate the stale entry instead of downloading it again
+            kwargs["headers"] = dict(kwargs.get("headers") or {}, **entry.conditional_headers())
+        response = self._send("GET", url, kwargs)
+        if response.status_code == 304 and entry is not None:
+            self.cache.record("revalidations")
+            self.cache.touch(key, entry)
+            cached = entry.to_response("revalidated")
+            cached.cortex_timing = response.cortex_timing
+            return cached
+
+        self.cache.record("misses")
+        response.cortex_cache = "miss"
+        if response.status_code == 200:
+            self.cache.store(key, response)
+        return response
+
+    def _send(self, method, url, kwargs):
+        start = time.perf_counter()
+        queued = self.limiter.acquire(url) if self.limiter is not None else 0.0
+        _connect_timing.seconds = 0.0
+        attempt = 0
+        try:
+            while True:
+                response = self.session.request(method, url, **kwargs)
+                if not self.retry_policy.should_retry(method, response.status_code, attempt):
+                    break
+                delay = self.retry_policy.delay(attempt, response.headers.get("Retry-After"))
+                response.close()
+                time.sleep(delay)
+                attempt += 1
+        except BaseException:
+            if self.limiter is not None:
+                self.limiter.release(url)
+            raise
+
+        if self.limiter is not None:
+            if kwargs.get("stream"):
+                # A streamed request stays in flight until its body is consumed
+                _release_when_done(response, lambda: self.limiter.release(url))
+            else:
+                self.limiter.release(url)
+        response.cortex_timing = {
+            "queued": queued,
+            "connect": _connect_timing.seconds,
+            "headers": time.perf_counter() - start,
+            "retries": attempt,
+        }
+        return response
+
+    def stream(self, method, url, replayable=None, **kwargs):
+        """
+        Send a streaming request whose body can be resumed after a dropped connection
+
+        Args:
+            replayable: Whether the whole request may be sent again when the stream
+                carries no SSE ids (defaults to True only for idempotent methods)
+
+        Returns:
+            ResumableResponse: Wrapper around the response; iter_sse_events uses it
+            to reconnect with Last-Event-ID or replay the request
+        """
+        kwargs["stream"] = True
+        response = self.request(method, url, **kwargs)
+        if replayable is None:
+            replayable = method.upper() in RetryPolicy.IDEMPOTENT_METHODS
+        return ResumableResponse(self, method, url, kwargs, response, replayable=replayable)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ResumableResponse:
+    """
+    Streaming response that can reissue its request
+
+    Attribute access (status_code, headers, json(), close(), ...) is forwarded
+    to the current underlying requests.Response.
+
+    Args:
+        client: CortexClient that sent the request
+        method: HTTP method
+        url: Full request URL
+        kwargs: Keyword arguments of the original request
+        response: The first response
+        replayable: Whether the request may be resent from the start without
+            Last-Event-ID (False for runs that must not be executed twice)
+    """
+
+    def __init__(self, client, method, url, kwargs, response, replayable=False):
+        self._client = client
+        self._method = method
+        self._url = url
+        self._kwargs = kwargs
+        self.response = response
+        self.replayable = replayable
+
+    def __getattr__(self, name):
+        return getattr(self.response, name)
+
+    def reconnect(self, last_event_id=None):
+        """
+        Close the current response and send the request again
+
+        Args:
+            last_event_id: Optional SSE id sent as Last-Event-ID so the server can resume
+
+        Raises:
+            CortexAPIError: If the new request does not succeed
+        """
+        headers = dict(self._kwargs.get("headers") or {})
+        if last_event_id is not None:
+            headers["Last-Event-ID"] = last_event_id
+        self.response.close()
+        response = self._client.request(self._method, self._url, **dict(self._kwargs, headers=headers))
+        if response.status_code != 200:
+            raise CortexAPIError(response.status_code, response.text)
+        self.response = response
+        return response
+
+
+class RateLimiter:
+    """
+    Thread-safe token-bucket rate limiter
+
+    Args:
+        rate: Sustained number of requests allowed per second
+        burst: Maximum number of requests allowed back to back (defaults to rate)
+    """
+
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError("rate must be greater than 0")
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(rate, 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        # Take one token and return how long the caller must wait for it
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        """
+        Block until a request may be sent
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self):
+        """
+        Wait without blocking the event loop until a request may be sent
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+def endpoint_key(url):
+    """
+    Return (account URL, endpoint) for a Cortex request URL
+
+    Endpoints are 'agent:run' (inline and agent object runs), 'analyst/message',
+    'analyst/feedback', 'threads' and 'agents' (agent CRUD); other paths are
+    returned unchanged.
+    """
+    parsed = urlparse(url)
+    account = f"{parsed.scheme}://{parsed.netloc}"
+    path = parsed.path
+    if path.endswith(":run"):
+        endpoint = "agent:run"
+    elif path.endswith("/cortex/analyst/message"):
+        endpoint = "analyst/message"
+    elif path.endswith("/cortex/analyst/feedback"):
+        endpoint = "analyst/feedback"
+    elif "/cortex/threads" in path:
+        endpoint = "threads"
+    elif "/agents" in path:
+        endpoint = "agents"
+    else:
+        endpoint = path
+    return account, endpoint
+
+
+class _Waiter:
+    # A queued request waiting for an in-flight slot, from a thread or an event loop
+
+    def __init__(self, loop=None):
+        self.loop = loop
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            self.future = loop.create_future()
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class _LimitSlot:
+    # Token bucket, in-flight counter and queueing stats for one (account, endpoint)
+
+    def __init__(self, rate=None, burst=None, max_in_flight=None):
+        self.bucket = RateLimiter(rate, burst) if rate else None
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.waiters = collections.deque()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.queued_seconds = 0.0
+        self.max_queued_seconds = 0.0
+        self.peak_in_flight = 0
+
+    def try_enter(self, waiter=None):
+        # Take a slot, or queue `waiter` and return False
+        with self.lock:
+            if self.max_in_flight is None or (self.in_flight < self.max_in_flight and not self.waiters):
+                self.in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+                return True
+            if waiter is not None:
+                self.waiters.append(waiter)
+            return False
+
+    def leave(self):
+        with self.lock:
+            if self.waiters:
+                # Hand the slot straight to the next waiter
+                self.waiters.popleft().wake()
+            else:
+                self.in_flight -= 1
+
+    def cancel(self, waiter):
+        # Returns True if the waiter was still queued (it never received a slot)
+        with self.lock:
+            try:
+                self.waiters.remove(waiter)
+                return True
+            except ValueError:
+                return False
+
+    def record(self, waited):
+        with self.lock:
+            self.requests += 1
+            self.queued_seconds += waited
+            self.max_queued_seconds = max(self.max_queued_seconds, waited)
+
+
+class RequestLimiter:
+    """
+    Token-bucket rate limit plus max-in-flight cap per (account URL, endpoint)
+
+    One instance can be shared by CortexClient and AsyncCortexClient so sync
+    and async callers draw from the same budget.
+
+    Args:
+        limits: {endpoint: {"rate": ..., "burst": ..., "max_in_flight": ...}} where
+            endpoint is a name returned by endpoint_key (e.g. "agent:run")
+        default: Limits for endpoints not listed in `limits` (None = unlimited)
+    """
+
+    def __init__(self, limits=None, default=None):
+        self.limits = dict(limits or {})
+        self.default = default
+        self._slots = {}
+        self._lock = threading.Lock()
+
+    def _slot(self, url):
+        key = endpoint_key(url)
+        slot = self._slots.get(key)
+        if slot is None:
+            with self._lock:
+                slot = self._slots.get(key)
+                if slot is None:
+                    slot = _LimitSlot(**(self.limits.get(key[1], self.default) or {}))
+                    self._slots[key] = slot
+        return slot
+
+    def acquire(self, url):
+        """
+        Block until a request to `url` may start; pair with release(url)
+
+        Returns:
+            float: Seconds spent queueing
+        """
+        slot = self._slot(url)
+        start = time.perf_counter()
+        waiter = _Waiter()
+        if not slot.try_enter(waiter):
+            waiter.event.wait()
+        if slot.bucket is not None:
+            slot.bucket.acquire()
+        waited = time.perf_counter() - start
+        slot.record(waited)
+        return waited
+
+    async def acquire_async(self, url):
+        """
+        Wait on the event loop until a request to `url` may start; pair with release(url)
+
+        Returns:
+            float: Seconds spent queueing
+        """
+        slot = self._slot(url)
+        start = time.perf_counter()
+        waiter = _Waiter(asyncio.get_running_loop())
+        if not slot.try_enter(waiter):
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                if not slot.cancel(waiter):
+                    # The slot was handed over while cancelling; pass it on
+                    slot.leave()
+                raise
+        if slot.bucket is not None:
+            try:
+                await slot.bucket.acquire_async()
+            except asyncio.CancelledError:
+                slot.leave()
+                raise
+        waited = time.perf_counter() - start
+        slot.record(waited)
+        return waited
+
+    def release(self, url):
+        self._slot(url).leave()
+
+    def stats(self):
+        """
+        Return queueing statistics keyed by "account endpoint"
+        """
+        stats = {}
+        for (account, endpoint), slot in list(self._slots.items()):
+            with slot.lock:
+                stats[f"{account} {endpoint}"] = {
+                    "requests": slot.requests,
+                    "queued_seconds": round(slot.queued_seconds, 6),
+                    "max_queued_seconds": round(slot.max_queued_seconds, 6),
+                    "in_flight": slot.in_flight,
+                    "peak_in_flight": slot.peak_in_flight,
+                    "waiting": len(slot.waiters),
+                }
+        return stats
+
+
+def _release_when_done(response, release):
+    """
+    Call release() once a streamed response is closed, fully read or garbage collected
+    """
+    finalizer = weakref.finalize(response, release)
+    close = response.close
+    iter_content = response.iter_content
+
+    def close_and_release():
+        try:
+            close()
+        finally:
+            finalizer()
+
+    def iter_content_and_release(*args, **kwargs):
+        try:
+            yield from iter_content(*args, **kwargs)
+        finally:
+            finalizer()
+
+    response.close = close_and_release
+    response.iter_content = iter_content_and_release
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client():
+    """
+    Return the process-wide shared CortexClient, creating it on first use
+    """
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = CortexClient()
+    return _default_client
@@ -0,0 +1,147 @@
+# Multi-turn conversations with a Cortex agent object
+# Continues a server-side thread so each turn sends only the new user message,
+# and falls back to resending the local history when threads are unavailable
+
+import json
+
+from cortex_client import CortexAPIError, get_default_client
+from cortex_events import AgentEventStream, render_events
+from run_cortex_agent_with_agent import (READABLE_EVENT_RENDERERS, create_thread, run_agent_object,
+                                         run_agent_object_with_conversation_history)
+
+# Status on a threaded run that means the thread itself is gone (expired, deleted, ...)
+THREAD_REJECTED_STATUSES = (404,)
+
+
+def thread_rejected(response):
+    """
+    Return True if a threaded run failed because of its thread: a 404, or a 400
+    whose error code or message names the thread or its parent message (other
+    400s are real request errors)
+    """
+    if response.status_code in THREAD_REJECTED_STATUSES:
+        return True
+    if response.status_code != 400:
+        return False
+    try:
+        body = json.loads(response.text)
+    except ValueError:
+        body = None
+    if isinstance(body, dict):
+        text = f"{body.get('code', '')} {body.get('error_code', '')} {body.get('message', '')}"
+    else:
+        text = response.text
+    text = text.lower()
+    return "thread" in text or "parent_message" in text
+
+
+class AgentConversation:
+    """
+    A conversation with an agent object that tracks thread and message IDs from the stream
+
+    The first turn creates a thread (unless thread_id is given). Every later turn
+    sends only the new user message with the assistant message ID of the previous
+    turn as parent_message_id. If no thread can be used, or the stream does not
+    report message IDs, the conversation switches to sending the full history.
+
+    Args:
+        token: Bearer token for authentication
+        agent_name: Name of the existing agent to run
+        database: Database name where the agent is stored
+        schema: Schema name where the agent is stored
+        account_url: Snowflake account URL
+        thread_id: Optional existing thread to continue
+        parent_message_id: Assistant message ID to continue from when thread_id is given
+        use_threads: Set to False to always send the full history
+        tool_choice: Optional tool_choice sent with every turn
+        client: Optional CortexClient to reuse (defaults to the shared pooled client)
+    """
+
+    def __init__(self, token, agent_name, database, schema, account_url, thread_id=None,
+                 parent_message_id=0, use_threads=True, tool_choice=None, client=None):
+        self.token = token
+        self.agent_name = agent_name
+        self.database = database
+        self.schema = schema
+        self.account_url = account_url
+        self.thread_id = thread_id
+        self.parent_message_id = parent_message_id
+        self.use_threads = use_threads
+        self.tool_choice = tool_choice
+        self.client = client or get_default_client()
+        # Kept locally so the conversation can fall back to sending history
+        self.history = []
+
+    def _ensure_thread(self):
+        if not self.use_threads or self.thread_id is not None:
+            return
+        try:
+            self.thread_id = create_thread(self.token, self.account_url, client=self.client)
+            self.parent_message_id = 0
+        except CortexAPIError:
+            self.use_threads = False
+        if self.thread_id is None:
+            self.use_threads = False
+
+    def _fall_back_to_history(self):
+        self.use_threads = False
+        self.thread_id = None
+
+    def _run_threaded(self, user_message, metrics):
+        return run_agent_object(
+            self.token, self.agent_name, user_message, self.database, self.schema, self.account_url,
+            thread_id=self.thread_id, parent_message_id=self.parent_message_id,
+            tool_choice=self.tool_choice, client=self.client, metrics=metrics
+        )
+
+    def _run_with_history(self, user_entry, metrics):
+        return run_agent_object_with_conversation_history(
+            self.token, self.agent_name, self.history + [user_entry], self.database, self.schema,
+            self.account_url, tool_choice=self.tool_choice, client=self.client, metrics=metrics
+        )
+
+    def send(self, user_message, sink=None, metrics=None):
+        """
+        Send one user message and wait for the agent's answer
+
+        Args:
+            user_message: The user's query/message
+            sink: Optional ConsoleSink to render the response into as it streams
+            metrics: Optional RunMetrics for this turn
+
+        Returns:
+            AgentResult: The structured result of the turn
+
+        Raises:
+            CortexAPIError: If the agent run fails
+        """
+        user_entry = {"role": "user", "content": [{"type": "text", "text": user_message}]}
+
+        self._ensure_thread()
+        threaded = self.use_threads
+        if threaded:
+            response = self._run_threaded(user_message, metrics)
+            if thread_rejected(response):
+                response.close()
+                self._fall_back_to_history()
+                threaded = False
+        if not threaded:
+            response = self._run_with_history(user_entry, metrics)
+        if response.status_code != 200:
+            raise CortexAPIError(response.status_code, response.text)
+
+        stream = AgentEventStream(response, metrics=metrics)
+        if sink is not None:
+            result = render_events(stream, READABLE_EVENT_RENDERERS, sink)
+        else:
+            result = stream.result()
+
+        self.history.append(user_entry)
+        self.history.append(result.message)
+        if threaded:
+            if result.message_id is None:
+                # Without the assistant message ID the thread cannot be continued
+                self._fall_back_to_history()
+            else:
+                self.parent_message_id = result.message_id
+        return result
@@ -0,0 +1,502 @@
+# Typed, non-printing event API for Cortex Agent and Analyst streams
+# Decodes SSE events into small typed objects, assembles a structured result
+# while they are consumed, and leaves presentation to optional sinks
+
+import json
+import sys
+import time
+from dataclasses import dataclass, field
+
+from cortex_metrics import timed_events
+from cortex_results import AgentMessageAccumulator, AnalystMessageAccumulator
+from cortex_sse import iter_sse_events
+from cortex_tables import ColumnarTable
+
+
+@dataclass
+class TextDeltaEvent:
+    text: str
+    content_index: int = None
+
+
+@dataclass
+class ThinkingDeltaEvent:
+    text: str
+    content_index: int = None
+
+
+@dataclass
+class TextEvent:
+    text: str
+    content_index: int = None
+
+
+@dataclass
+class ThinkingEvent:
+    text: str
+    content_index: int = None
+
+
+@dataclass
+class ToolUseEvent:
+    name: str
+    type: str
+    tool_use_id: str = None
+    input: dict = None
+
+
+@dataclass
+class ToolResultEvent:
+    name: str
+    type: str
+    status: str
+    tool_use_id: str = None
+    content: list = None
+
+
+@dataclass
+class ChartEvent:
+    chart_spec: object  # Parsed chart specification (the raw string if it is not JSON)
+    tool_use_id: str = None
+
+
+@dataclass
+class TableEvent:
+    table: object  # ColumnarTable, or SpilledTable when a TableSpill wrote it to disk
+    tool_use_id: str = None
+
+
+@dataclass
+class StatusEvent:
+    status: str
+    message: str = ""
+
+
+@dataclass
+class ErrorEvent:
+    message: str
+    code: str = None
+    request_id: str = None
+
+
+@dataclass
+class MetadataEvent:
+    role: str
+    message_id: int = None
+    thread_id: str = None
+
+
+@dataclass
+class DoneEvent:
+    pass
+
+
+@dataclass
+class AnalystTextDeltaEvent:
+    index: int
+    text: str
+
+
+@dataclass
+class SqlDeltaEvent:
+    index: int
+    statement: str
+
+
+@dataclass
+class SuggestionDeltaEvent:
+    index: int
+    suggestion_index: int
+    text: str
+
+
+@dataclass
+class WarningsEvent:
+    warnings: list
+
+
+@dataclass
+class ResponseMetadataEvent:
+    metadata: dict
+
+
+def _decode_tool_use(data):
+    return ToolUseEvent(
+        name=data.get('name', 'Unknown'),
+        type=data.get('type', 'Unknown'),
+        tool_use_id=data.get('tool_use_id'),
+        input=data.get('input')
+    )
+
+
+def _decode_tool_result(data):
+    return ToolResultEvent(
+        name=data.get('name', 'Unknown'),
+        type=data.get('type', 'Unknown'),
+        status=data.get('status', 'Unknown'),
+        tool_use_id=data.get('tool_use_id'),
+        content=data.get('content')
+    )
+
+
+def _decode_chart(data):
+    chart_spec = data.get('chart_spec')
+    if isinstance(chart_spec, str):
+        try:
+            chart_spec = json.loads(chart_spec)
+        except json.JSONDecodeError:
+            pass
+    return ChartEvent(chart_spec, data.get('tool_use_id'))
+
+
+def _decode_table(data):
+    return TableEvent(ColumnarTable.from_result_set(data.get('result_set', {})), data.get('tool_use_id'))
+
+
+def _decode_metadata(data):
+    # IDs are nested under "metadata" in agent:run streams
+    metadata = data.get('metadata', data)
+    return MetadataEvent(
+        role=data.get('role', metadata.get('role', '')),
+        message_id=metadata.get('message_id'),
+        thread_id=metadata.get('thread_id')
+    )
+
+
+def _decode_error(data):
+    return ErrorEvent(
+        message=data.get('message', 'Unknown error'),
+        code=data.get('code', 'Unknown'),
+        request_id=data.get('request_id', 'Unknown')
+    )
+
+
+# SSE event type -> decoder from JSON payload to typed event
+AGENT_EVENT_DECODERS = {
+    'response.text.delta': lambda d: TextDeltaEvent(d.get('text', ''), d.get('content_index')),
+    'response.thinking.delta': lambda d: ThinkingDeltaEvent(d.get('text', ''), d.get('content_index')),
+    'response.text': lambda d: TextEvent(d.get('text', ''), d.get('content_index')),
+    'response.thinking': lambda d: ThinkingEvent(d.get('text', ''), d.get('content_index')),
+    'response.tool_use': _decode_tool_use,
+    'response.tool_result': _decode_tool_result,
+    'response.chart': _decode_chart,
+    'response.table': _decode_table,
+    'response.status': lambda d: StatusEvent(d.get('status', ''), d.get('message', '')),
+    'metadata': _decode_metadata,
+    'error': _decode_error,
+}
+
+
+def _decode_analyst_delta(data):
+    index = data.get('index', 0)
+    content_type = data.get('type', '')
+    if content_type == 'text':
+        return AnalystTextDeltaEvent(index, data.get('text_delta', ''))
+    if content_type == 'sql':
+        return SqlDeltaEvent(index, data.get('statement_delta', ''))
+    if content_type == 'suggestions':
+        delta = data.get('suggestions_delta', {})
+        return SuggestionDeltaEvent(index, delta.get('index', 0), delta.get('suggestion_delta', ''))
+    return None
+
+
+ANALYST_EVENT_DECODERS = {
+    'status': lambda d: StatusEvent(d.get('status', '')),
+    'message.content.delta': _decode_analyst_delta,
+    'warnings': lambda d: WarningsEvent(d.get('warnings', [])),
+    'response_metadata': lambda d: ResponseMetadataEvent(d),
+    'error': lambda d: ErrorEvent(d.get('message', ''), d.get('code', '')),
+}
+
+
+def iter_agent_events(sse_events, table_spill=None):
+    """
+    Decode SSE events from an agent:run stream into typed events, ending with DoneEvent
+    
+    Args:
+        sse_events: Iterable of SSEEvent
+        table_spill: Optional TableSpill applied to every decoded table
+    """
+    for event in sse_events:
+        data = event.data
+        if event.event == 'done':
+            if data == '[DONE]':
+                yield DoneEvent()
+                return
+            continue
+
+        decoder = AGENT_EVENT_DECODERS.get(event.event)
+        if decoder is None or data == '[DONE]':
+            continue
+        try:
+            json_data = json.loads(data)
+        except json.JSONDecodeError:
+            # Not JSON, might be plain text
+            if event.event == 'response.text.delta':
+                yield TextDeltaEvent(data)
+            continue
+        typed = decoder(json_data)
+        if table_spill is not None and type(typed) is TableEvent:
+            typed.table = table_spill.apply(typed.table)
+        yield typed
+
+
+def iter_analyst_events(sse_events):
+    """
+    Decode SSE events from an analyst/message stream into typed events, ending with DoneEvent
+    """
+    for event in sse_events:
+        if event.event == 'done':
+            yield DoneEvent()
+            return
+
+        decoder = ANALYST_EVENT_DECODERS.get(event.event)
+        if decoder is None:
+            continue
+        try:
+            json_data = json.loads(event.data)
+        except json.JSONDecodeError:
+            continue
+        typed = decoder(json_data)
+        if typed is not None:
+            yield typed
+        if event.event == 'error':
+            return
+
+
+@dataclass
+class AgentResult:
+    """
+    Structured outcome of one agent run
+    """
+    text: str = ""
+    thinking: str = ""
+    message: dict = field(default_factory=dict)
+    tool_uses: list = field(default_factory=list)
+    tool_results: list = field(default_factory=list)
+    charts: list = field(default_factory=list)
+    tables: list = field(default_factory=list)
+    statuses: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+    thread_id: str = None
+    user_message_id: int = None
+    message_id: int = None  # ID of the assistant message, the parent of the next turn
+    completed: bool = False
+
+
+class AgentEventStream:
+    """
+    Iterable of typed agent events that assembles an AgentResult as it is consumed
+
+    Args:
+        response: Streaming response from an agent run
+        metrics: Optional RunMetrics recording event timings
+        table_spill: Optional TableSpill for writing large tables to disk
+    """
+
+    def __init__(self, response, metrics=None, table_spill=None):
+        sse_events = iter_sse_events(response)
+        if metrics is not None:
+            sse_events = timed_events(sse_events, metrics)
+        self._events = iter_agent_events(sse_events, table_spill)
+        self._metrics = metrics
+        self._accumulator = AgentMessageAccumulator()
+        self._result = AgentResult()
+        self.streamed_text = False
+
+    @property
+    def text(self):
+        """
+        Text received so far (a TextAccumulator)
+        """
+        return self._accumulator.text
+
+    def __iter__(self):
+        for event in self._events:
+            self._apply(event)
+            yield event
+        if self._metrics is not None:
+            self._metrics.finish()
+
+    def _apply(self, event):
+        result = self._result
+        event_type = type(event)
+        accumulator = self._accumulator
+        if event_type is TextDeltaEvent:
+            accumulator.text.append(event.text)
+            self.streamed_text = True
+        elif event_type is ThinkingDeltaEvent:
+            accumulator.thinking.append(event.text)
+        elif event_type is TextEvent:
+            if event.text:
+                accumulator.text.set(event.text)
+        elif event_type is ThinkingEvent:
+            if event.text and not accumulator.thinking:
+                accumulator.thinking.set(event.text)
+        elif event_type is ToolUseEvent:
+            result.tool_uses.append(event)
+        elif event_type is ToolResultEvent:
+            result.tool_results.append(event)
+        elif event_type is ChartEvent:
+            result.charts.append(event)
+        elif event_type is TableEvent:
+            result.tables.append(event)
+        elif event_type is StatusEvent:
+            result.statuses.append(event)
+        elif event_type is ErrorEvent:
+            result.errors.append(event)
+        elif event_type is MetadataEvent:
+            if event.thread_id is not None:
+                result.thread_id = event.thread_id
+            if event.role == 'user':
+                result.user_message_id = event.message_id
+            elif event.role == 'assistant':
+                result.message_id = event.message_id
+        elif event_type is DoneEvent:
+            result.completed = True
+
+    def result(self):
+        """
+        Consume any remaining events and return the AgentResult
+        """
+        for _ in self:
+            pass
+        self._result.text = self._accumulator.text.value()
+        self._result.thinking = self._accumulator.thinking.value()
+        self._result.message = self._accumulator.result()
+        return self._result
+
+
+@dataclass
+class AnalystResult:
+    """
+    Structured outcome of one streamed analyst/message request
+    """
+    message: dict = field(default_factory=dict)
+    warnings: list = field(default_factory=list)
+    response_metadata: dict = field(default_factory=dict)
+    statuses: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+    completed: bool = False
+
+    def as_dict(self):
+        """
+        Return the result in the shape of a non-streaming analyst/message response
+        """
+        return {
+            "message": self.message,
+            "warnings": self.warnings,
+            "response_metadata": self.response_metadata
+        }
+
+
+class AnalystEventStream:
+    """
+    Iterable of typed analyst events that assembles an AnalystResult as it is consumed
+
+    Args:
+        response: Streaming response from send_analyst_message(stream=True)
+    """
+
+    def __init__(self, response):
+        self._events = iter_analyst_events(iter_sse_events(response))
+        self._accumulator = AnalystMessageAccumulator()
+        self._result = AnalystResult()
+
+    def __iter__(self):
+        for event in self._events:
+            self._apply(event)
+            yield event
+
+    def _apply(self, event):
+        event_type = type(event)
+        if event_type is AnalystTextDeltaEvent:
+            self._accumulator.add_text(event.index, event.text)
+        elif event_type is SqlDeltaEvent:
+            self._accumulator.add_sql(event.index, event.statement)
+        elif event_type is SuggestionDeltaEvent:
+            self._accumulator.add_suggestion(event.index, event.suggestion_index, event.text)
+        elif event_type is WarningsEvent:
+            self._accumulator.warnings.extend(event.warnings)
+        elif event_type is ResponseMetadataEvent:
+            self._accumulator.response_metadata.update(event.metadata)
+        elif event_type is StatusEvent:
+            self._result.statuses.append(event)
+        elif event_type is ErrorEvent:
+            self._result.errors.append(event)
+        elif event_type is DoneEvent:
+            self._result.completed = True
+
+    def result(self):
+        """
+        Consume any remaining events and return the AnalystResult
+        """
+        for _ in self:
+            pass
+        assembled = self._accumulator.result()
+        self._result.message = assembled["message"]
+        self._result.warnings = assembled["warnings"]
+        self._result.response_metadata = assembled["response_metadata"]
+        return self._result
+
+
+class ConsoleSink:
+    """
+    Buffered text sink for console rendering
+
+    Output is written in batches once `buffer_size` characters are pending or
+    `flush_interval` seconds have passed, instead of one flushed write per delta.
+
+    Args:
+        stream: File object to write to (defaults to sys.stdout)
+        buffer_size: Pending characters that trigger a write
+        flush_interval: Maximum seconds output may stay buffered
+    """
+
+    def __init__(self, stream=None, buffer_size=4096, flush_interval=0.05):
+        self.stream = stream if stream is not None else sys.stdout
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._parts = []
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def write(self, text):
+        if not text:
+            return
+        self._parts.append(text)
+        self._pending += len(text)
+        if self._pending >= self.buffer_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def line(self, text=""):
+        self.write(text + "\n")
+
+    def flush(self):
+        if self._parts:
+            self.stream.write("".join(self._parts))
+            self._parts = []
+            self._pending = 0
+        self.stream.flush()
+        self._last_flush = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+
+def render_events(stream, renderers, sink):
+    """
+    Render typed events to a sink using a {event class: renderer(event, stream, sink)} table
+
+    Returns:
+        The stream's final result
+    """
+    with sink:
+        for event in stream:
+            renderer = renderers.get(type(event))
+            if renderer is not None:
+                renderer(event, stream, sink)
+    return stream.result()
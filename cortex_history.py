@@ -0,0 +1,128 @@
+# Bounded conversation history for multi-turn Cortex Analyst sessions
+# Keeps the messages sent with each follow-up question small: suggestion blocks
+# are stripped, repeated SQL is sent once, and the oldest turns are dropped
+# (optionally folded into a one-line summary) once a byte budget is exceeded
+
+import json
+import re
+
+# Rough bytes-per-token ratio used to turn a token budget into a byte budget
+BYTES_PER_TOKEN = 4
+
+
+def _message_size(message):
+    return len(json.dumps(message, separators=(",", ":")).encode("utf-8"))
+
+
+def _sql_key(statement):
+    return re.sub(r"\s+", " ", statement).strip().rstrip(";").strip()
+
+
+class AnalystHistory:
+    """
+    Conversation history for send_analyst_message with a size budget
+
+    Args:
+        max_bytes: Budget for the serialized history (ignored if max_tokens is given)
+        max_tokens: Optional budget in approximate tokens
+        max_turns: Optional maximum number of question/answer turns kept
+        summarize: Fold dropped questions into the first kept question instead of losing them
+        strip_suggestions: Remove suggestion blocks from analyst messages
+        dedupe_sql: Keep only the most recent copy of a repeated SQL statement
+        summary_questions: Number of dropped questions kept in the summary (0 keeps none)
+    """
+
+    def __init__(self, max_bytes=32 * 1024, max_tokens=None, max_turns=None, summarize=True,
+                 strip_suggestions=True, dedupe_sql=True, summary_questions=5):
+        self.max_bytes = max_tokens * BYTES_PER_TOKEN if max_tokens else max_bytes
+        self.max_turns = max_turns
+        self.summarize = summarize
+        self.strip_suggestions = strip_suggestions
+        self.dedupe_sql = dedupe_sql
+        self.summary_questions = summary_questions
+        # Each turn is [user message, analyst message, serialized size]
+        self._turns = []
+        self._dropped_questions = []
+
+    def __len__(self):
+        return len(self._turns)
+
+    def _compact(self, analyst_message):
+        content = []
+        for block in analyst_message.get("content", []):
+            block_type = block.get("type")
+            if block_type == "suggestions" and self.strip_suggestions:
+                continue
+            if block_type == "sql":
+                # Only the statement is useful as context
+                block = {"type": "sql", "statement": block.get("statement", "")}
+            content.append(block)
+        return {"role": "analyst", "content": content}
+
+    def _drop_repeated_sql(self, analyst_message):
+        keys = {_sql_key(block["statement"]) for block in analyst_message["content"] if block["type"] == "sql"}
+        if not keys:
+            return
+        for turn in self._turns:
+            content = turn[1]["content"]
+            kept = [block for block in content
+                    if block.get("type") != "sql" or _sql_key(block.get("statement", "")) not in keys]
+            if len(kept) != len(content):
+                turn[1]["content"] = kept or [{"type": "text", "text": "(SQL repeated in a later answer)"}]
+                turn[2] = _message_size(turn[0]) + _message_size(turn[1])
+
+    def add_turn(self, question, analyst_message):
+        """
+        Record a question and the analyst message that answered it
+
+        Args:
+            question: The user's question text
+            analyst_message: The "message" object from an analyst/message response
+        """
+        user_message = {"role": "user", "content": [{"type": "text", "text": question}]}
+        analyst_message = self._compact(analyst_message)
+        if self.dedupe_sql:
+            self._drop_repeated_sql(analyst_message)
+        self._turns.append([user_message, analyst_message,
+                            _message_size(user_message) + _message_size(analyst_message)])
+        self._enforce_budget()
+
+    def _summary(self):
+        if not self.summarize or not self._dropped_questions:
+            return ""
+        questions = [question[:200] for question in self._dropped_questions[-self.summary_questions:]]
+        return "Earlier questions in this conversation: " + "; ".join(questions) + "\n\n"
+
+    def size_bytes(self):
+        """
+        Approximate serialized size of messages()
+        """
+        return sum(turn[2] for turn in self._turns) + len(self._summary().encode("utf-8"))
+
+    def _enforce_budget(self):
+        # The latest turn is always kept, even if it alone exceeds the budget
+        while len(self._turns) > 1 and (
+                self.size_bytes() > self.max_bytes
+                or (self.max_turns is not None and len(self._turns) > self.max_turns)):
+            user_message = self._turns.pop(0)[0]
+            self._dropped_questions.append(user_message["content"][0]["text"])
+        # [:-0] would be an empty slice, so summary_questions=0 needs its own branch
+        if self.summary_questions > 0:
+            del self._dropped_questions[:-self.summary_questions]
+        else:
+            self._dropped_questions.clear()
+
+    def messages(self):
+        """
+        Return the history as a message list for conversation_history
+        """
+        messages = []
+        for user_message, analyst_message, _ in self._turns:
+            messages.append(user_message)
+            messages.append(analyst_message)
+        summary = self._summary()
+        if summary and messages:
+            first = messages[0]
+            text = first["content"][0]["text"]
+            messages[0] = {"role": "user", "content": [{"type": "text", "text": summary + text}]}
+        return messages
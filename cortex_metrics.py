@@ -0,0 +1,240 @@
+# Per-run latency instrumentation for Cortex Agent streaming requests
+# Records limiter queueing, connect time, time to headers and the arrival of
+# key stream events relative to the start of the request, and hands the result
+# to exporters
+
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger("cortex.metrics")
+
+
+class RunMetrics:
+    """
+    Timing of one streamed agent run; all phase times are seconds since the request started
+
+    Args:
+        name: Label for the run (e.g. the agent name or "inline")
+        exporters: Optional list of exporters called by finish()
+    """
+
+    def __init__(self, name="agent_run", exporters=None):
+        self.name = name
+        self.exporters = list(exporters or [])
+        self.started_at = None
+        self.queued = None
+        self.connect = None
+        self.headers = None
+        self.first_status = None
+        self.first_tool_use = None
+        self.tool_results = []
+        self.first_text_delta = None
+        self.done = None
+        self.total = None
+        self.event_count = 0
+        self.status_code = None
+        self._finished = False
+
+    def start(self):
+        self.started_at = time.perf_counter()
+
+    def elapsed(self):
+        # Runs that were not started explicitly (e.g. metrics passed only to the
+        # event parser) are timed from their first observation
+        if self.started_at is None:
+            self.start()
+        return time.perf_counter() - self.started_at
+
+    def record_response(self, response):
+        """
+        Record connection and header timing from a CortexClient response
+        """
+        self.status_code = response.status_code
+        timing = getattr(response, "cortex_timing", None)
+        if timing is not None:
+            self.queued = timing.get("queued")
+            self.connect = timing["connect"]
+            self.headers = timing["headers"]
+        else:
+            self.headers = self.elapsed()
+
+    def observe(self, event):
+        """
+        Record the arrival time of a stream event (an SSEEvent)
+        """
+        self.event_count += 1
+        event_type = event.event
+        if event_type == 'response.text.delta':
+            if self.first_text_delta is None:
+                self.first_text_delta = self.elapsed()
+        elif event_type == 'response.status':
+            if self.first_status is None:
+                self.first_status = self.elapsed()
+        elif event_type == 'response.tool_use':
+            if self.first_tool_use is None:
+                self.first_tool_use = self.elapsed()
+        elif event_type == 'response.tool_result':
+            try:
+                data = event.json()
+            except ValueError:
+                data = {}
+            self.tool_results.append({
+                "name": data.get('name', 'Unknown'),
+                "status": data.get('status', 'Unknown'),
+                "seconds": self.elapsed()
+            })
+        elif event_type == 'done':
+            self.done = self.elapsed()
+
+    def finish(self):
+        """
+        Close the run and send it to every exporter (only the first call has an effect)
+        """
+        if self._finished:
+            return
+        self._finished = True
+        self.total = self.elapsed()
+        for exporter in self.exporters:
+            try:
+                exporter.export(self)
+            except Exception as e:
+                # Metrics must never break the request path
+                logger.warning("Metrics exporter %s failed: %s", type(exporter).__name__, e)
+
+    def phases(self):
+        """
+        Return the single-valued phases that were observed, keyed by phase name
+        """
+        phases = {
+            "queued": self.queued,
+            "connect": self.connect,
+            "headers": self.headers,
+            "first_status": self.first_status,
+            "first_tool_use": self.first_tool_use,
+            "first_text_delta": self.first_text_delta,
+            "done": self.done,
+            "total": self.total,
+        }
+        return {name: value for name, value in phases.items() if value is not None}
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "status_code": self.status_code,
+            "event_count": self.event_count,
+            "phases": self.phases(),
+            "tool_results": self.tool_results,
+        }
+
+
+def timed_events(events, metrics):
+    """
+    Pass SSE events through while recording their arrival in `metrics`
+
+    The run is finished when the stream ends or the generator is closed.
+    """
+    try:
+        for event in events:
+            metrics.observe(event)
+            yield event
+    finally:
+        metrics.finish()
+
+
+class LogExporter:
+    """
+    Emit each run as one JSON log line
+
+    Args:
+        log: Logger to write to (defaults to the "cortex.metrics" logger)
+        level: Logging level
+    """
+
+    def __init__(self, log=None, level=logging.INFO):
+        self.log = log or logger
+        self.level = level
+
+    def export(self, metrics):
+        self.log.log(self.level, "cortex_run %s", json.dumps(metrics.as_dict()))
+
+
+class StatsDExporter:
+    """
+    Send phase timings as StatsD timers over UDP (fire and forget)
+
+    Args:
+        host: StatsD host
+        port: StatsD port
+        prefix: Metric name prefix
+    """
+
+    def __init__(self, host="127.0.0.1", port=8125, prefix="cortex.agent_run"):
+        self.address = (host, port)
+        self.prefix = prefix
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def export(self, metrics):
+        lines = [
+            f"{self.prefix}.{metrics.name}.{phase}:{seconds * 1000:.3f}|ms"
+            for phase, seconds in metrics.phases().items()
+        ]
+        for result in metrics.tool_results:
+            lines.append(f"{self.prefix}.{metrics.name}.tool_result.{result['name']}:"
+                         f"{result['seconds'] * 1000:.3f}|ms")
+        lines.append(f"{self.prefix}.{metrics.name}.runs:1|c")
+        self._socket.sendto("\n".join(lines).encode("utf-8"), self.address)
+
+
+def _label(value):
+    # Escape a Prometheus label value (backslash, double quote and newline)
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class PrometheusFileExporter:
+    """
+    Write the latest run's phases to a node_exporter textfile-collector file
+
+    Args:
+        path: Output .prom file (replaced atomically on every export)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.runs = {}
+        self.latest = {}
+        self._lock = threading.Lock()
+
+    def export(self, metrics):
+        with self._lock:
+            self.runs[metrics.name] = self.runs.get(metrics.name, 0) + 1
+            self.latest[metrics.name] = metrics
+            self._write()
+
+    def _write(self):
+        lines = [
+            "# HELP cortex_agent_run_phase_seconds Seconds from request start to each phase of the latest run",
+            "# TYPE cortex_agent_run_phase_seconds gauge",
+        ]
+        for name, run in sorted(self.latest.items()):
+            for phase, seconds in run.phases().items():
+                lines.append(f'cortex_agent_run_phase_seconds{{run="{_label(name)}",phase="{phase}"}} {seconds:.6f}')
+            for index, result in enumerate(run.tool_results):
+                lines.append(f'cortex_agent_run_phase_seconds{{run="{_label(name)}",phase="tool_result",'
+                             f'tool="{_label(result["name"])}",index="{index}"}} {result["seconds"]:.6f}')
+        lines.append("# HELP cortex_agent_runs_total Agent runs observed by this process")
+        lines.append("# TYPE cortex_agent_runs_total counter")
+        for name, count in sorted(self.runs.items()):
+            lines.append(f'cortex_agent_runs_total{{run="{_label(name)}"}} {count}')
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        # mkstemp creates the file as 0600; the collector usually runs as another user
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,477 @@
+# Local stand-in for the Snowflake Cortex REST APIs
+# Serves agent:run, agent object CRUD/run, threads and Cortex Analyst endpoints with
+# recorded or synthetic SSE streams, so clients and parsers can be exercised
+# and benchmarked without a Snowflake account or network access
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+AGENTS_PATH = re.compile(r"^/api/v2/databases/([^/]+)/schemas/([^/]+)/agents(?:/([^/:]+)(:run)?)?$")
+AGENT_RUN_PATH = "/api/v2/cortex/agent:run"
+ANALYST_MESSAGE_PATH = "/api/v2/cortex/analyst/message"
+ANALYST_FEEDBACK_PATH = "/api/v2/cortex/analyst/feedback"
+THREADS_PATH = "/api/v2/cortex/threads"
+
+
+def resolve_identifier(name):
+    """
+    Resolve an agent name like Snowflake: unquoted names are upper-cased,
+    double-quoted names are kept as written
+    """
+    name = unquote(name)
+    if len(name) >= 2 and name.startswith('"') and name.endswith('"'):
+        return name[1:-1].replace('""', '"')
+    return name.upper()
+
+
+def _agent_path_groups(match):
+    database, schema, name, run = match.groups()
+    return database, schema, resolve_identifier(name) if name else name, run
+
+
+def format_sse_event(event, data, event_id=None):
+    """
+    Encode one Server-Sent Event as bytes
+
+    Args:
+        event: Event type
+        data: Event payload (dict/list is JSON encoded, str is sent as-is)
+        event_id: Optional SSE id field
+    """
+    if not isinstance(data, str):
+        data = json.dumps(data)
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.extend(f"data: {line}" for line in data.split("\n"))
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+def load_recorded_events(path):
+    """
+    Load a recorded SSE stream (raw text/event-stream body) as a list of (event, data) pairs
+    """
+    from cortex_sse import SSEDecoder
+
+    decoder = SSEDecoder()
+    with open(path, "rb") as f:
+        # Terminate the last event in case the recording stops right after its data line
+        events = decoder.feed(f.read() + b"\n\n")
+    return [(event.event, event.data) for event in events]
+
+
+def synthetic_agent_events(text_tokens=200, token_text="lorem ", thinking_tokens=20):
+    """
+    Build a synthetic agent:run event sequence shaped like a real Cortex Agent answer
+    """
+    events = [
+        ("response.status", {"status": "planning", "message": "Planning the next steps"}),
+    ]
+    for _ in range(thinking_tokens):
+        events.append(("response.thinking.delta", {"content_index": 0, "text": "thinking "}))
+    events.append(("response.tool_use", {
+        "content_index": 1, "tool_use_id": "toolu_1", "type": "cortex_analyst_text_to_sql",
+        "name": "Analyst1", "input": {"query": "total revenue"}
+    }))
+    events.append(("response.status", {"status": "executing_tool", "message": "Executing Analyst1"}))
+    events.append(("response.tool_result", {
+        "content_index": 2, "tool_use_id": "toolu_1", "type": "cortex_analyst_text_to_sql",
+        "name": "Analyst1", "status": "success",
+        "content": [{"type": "json", "json": {"sql": "SELECT SUM(revenue) FROM revenue"}}]
+    }))
+    events.append(("response.table", {
+        "content_index": 3, "tool_use_id": "toolu_1",
+        "result_set": {
+            "resultSetMetaData": {"numRows": 2, "rowType": [
+                {"name": "MONTH", "type": "text"}, {"name": "REVENUE", "type": "fixed"}
+            ]},
+            "data": [["2024-01", "100"], ["2024-02", "120"]]
+        }
+    }))
+    events.append(("response.status", {"status": "proceeding_to_answer", "message": "Forming the answer"}))
+    for _ in range(text_tokens):
+        events.append(("response.text.delta", {"content_index": 4, "text": token_text}))
+    events.append(("done", "[DONE]"))
+    return events
+
+
+def synthetic_analyst_events(text_tokens=50, sql_tokens=20, suggestions=3):
+    """
+    Build a synthetic analyst/message event sequence with text, SQL and suggestion blocks
+    """
+    events = [("status", {"status": "interpreting_question"})]
+    for _ in range(text_tokens):
+        events.append(("message.content.delta", {"index": 0, "type": "text", "text_delta": "word "}))
+    events.append(("status", {"status": "generating_sql"}))
+    for _ in range(sql_tokens):
+        events.append(("message.content.delta", {"index": 1, "type": "sql", "statement_delta": "SELECT 1 "}))
+    for i in range(suggestions):
+        for part in ("What about ", f"question {i + 1}?"):
+            events.append(("message.content.delta", {
+                "index": 2, "type": "suggestions",
+                "suggestions_delta": {"index": i, "suggestion_delta": part}
+            }))
+    events.append(("response_metadata", {"model_names": ["mock"], "question_category": "CLEAR_SQL"}))
+    events.append(("status", {"status": "done"}))
+    events.append(("done", {}))
+    return events
+
+
+def analyst_message_from_events(events):
+    """
+    Assemble a non-streaming analyst/message response from a streamed event sequence
+    """
+    from cortex_results import AnalystMessageAccumulator
+
+    accumulator = AnalystMessageAccumulator()
+    for event, data in events:
+        if event != "message.content.delta":
+            continue
+        data = json.loads(data) if isinstance(data, str) else data
+        if data["type"] == "text":
+            accumulator.add_text(data["index"], data.get("text_delta", ""))
+        elif data["type"] == "sql":
+            accumulator.add_sql(data["index"], data.get("statement_delta", ""))
+        elif data["type"] == "suggestions":
+            delta = data.get("suggestions_delta", {})
+            accumulator.add_suggestion(data["index"], delta.get("index", 0), delta.get("suggestion_delta", ""))
+    result = accumulator.result()
+    result["request_id"] = "mock-request"
+    return result
+
+
+class MockCortexConfig:
+    """
+    Behaviour of the mock server
+
+    Args:
+        agent_events: List of (event, data) pairs streamed for agent runs
+        analyst_events: List of (event, data) pairs streamed for analyst messages
+        token_rate: Events per second to stream (None = as fast as possible)
+        latency: Seconds to wait before sending response headers
+        error_rate: Fraction of requests answered with error_status
+        error_status: HTTP status used for injected errors
+        disconnect_rate: Fraction of streams cut off halfway through
+        event_ids: Add SSE id fields and honour Last-Event-ID for resumption
+    """
+
+    def __init__(self, agent_events=None, analyst_events=None, token_rate=None, latency=0.0,
+                 error_rate=0.0, error_status=503, disconnect_rate=0.0, event_ids=False):
+        self.agent_events = agent_events if agent_events is not None else synthetic_agent_events()
+        self.analyst_events = analyst_events if analyst_events is not None else synthetic_analyst_events()
+        self.token_rate = token_rate
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.disconnect_rate = disconnect_rate
+        self.event_ids = event_ids
+
+
+class MockCortexHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Send small SSE chunks immediately instead of waiting on delayed ACKs
+    disable_nagle_algorithm = True
+
+    # Set per server in MockCortexServer
+    config = None
+    agents = None
+    agents_lock = None
+    # thread_id -> last assistant message ID (0 before the first turn)
+    threads = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except json.JSONDecodeError:
+            return {}
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_json_cacheable(self, body):
+        # GET responses carry an ETag and honour If-None-Match with 304
+        etag = '"' + hashlib.sha1(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._send_json(200, body, {"ETag": etag})
+
+    def _inject_faults(self):
+        # Returns True if the request was answered with an injected error
+        config = self.config
+        if config.latency:
+            time.sleep(config.latency)
+        if config.error_rate and random.random() < config.error_rate:
+            headers = {"Retry-After": "1"} if config.error_status in (429, 503) else None
+            self._send_json(config.error_status, {
+                "code": str(config.error_status), "message": "Injected error", "request_id": "mock"
+            }, headers)
+            return True
+        return False
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+
+    def _stream(self, events):
+        config = self.config
+        start_index = 0
+        last_event_id = self.headers.get("Last-Event-ID")
+        if config.event_ids and last_event_id is not None and last_event_id.isdigit():
+            start_index = int(last_event_id) + 1
+
+        cut_at = None
+        if config.disconnect_rate and random.random() < config.disconnect_rate:
+            cut_at = start_index + max((len(events) - start_index) // 2, 1)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        interval = 1.0 / config.token_rate if config.token_rate else 0
+        next_send = time.perf_counter()
+        for index in range(start_index, len(events)):
+            if cut_at is not None and index >= cut_at:
+                # Drop the connection without the terminating chunk
+                self.wfile.flush()
+                self.close_connection = True
+                return
+            if interval:
+                next_send += interval
+                delay = next_send - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            event, data = events[index]
+            self._write_chunk(format_sse_event(event, data, index if config.event_ids else None))
+            if interval:
+                self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _thread_events(self, body):
+        """
+        Wrap the agent stream with user/assistant message metadata for a threaded run
+
+        Returns:
+            The events to stream, or None if the request was answered with an error
+        """
+        thread_id = str(body["thread_id"])
+        parent_message_id = body.get("parent_message_id", 0)
+        with self.agents_lock:
+            if thread_id not in self.threads:
+                self._send_json(404, {"message": f"Thread {thread_id} does not exist"})
+                return None
+            if parent_message_id != self.threads[thread_id]:
+                self._send_json(400, {"message": f"Invalid parent_message_id {parent_message_id}"})
+                return None
+            user_message_id = parent_message_id + 1
+            assistant_message_id = parent_message_id + 2
+            self.threads[thread_id] = assistant_message_id
+        events = list(self.config.agent_events)
+        events.insert(0, ("metadata", {"role": "user", "metadata": {"message_id": user_message_id}}))
+        events.insert(len(events) - 1, ("metadata", {
+            "role": "assistant", "metadata": {"message_id": assistant_message_id}
+        }))
+        return events
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self._read_json()
+        if self._inject_faults():
+            return
+
+        if path == AGENT_RUN_PATH:
+            return self._stream(self.config.agent_events)
+        if path == ANALYST_MESSAGE_PATH:
+            if body.get("stream", False):
+                return self._stream(self.config.analyst_events)
+            return self._send_json(200, analyst_message_from_events(self.config.analyst_events))
+        if path == ANALYST_FEEDBACK_PATH:
+            return self._send_json(200, {})
+        if path == THREADS_PATH:
+            with self.agents_lock:
+                thread_id = str(len(self.threads) + 1)
+                self.threads[thread_id] = 0
+            return self._send_json(200, thread_id)
+
+        match = AGENTS_PATH.match(path)
+        if match:
+            database, schema, name, run = _agent_path_groups(match)
+            if name and run:
+                with self.agents_lock:
+                    exists = (database, schema, name) in self.agents
+                if not exists:
+                    return self._send_json(404, {"message": f"Agent {name} does not exist"})
+                if "thread_id" in body:
+                    events = self._thread_events(body)
+                    if events is None:
+                        return
+                    return self._stream(events)
+                return self._stream(self.config.agent_events)
+            if not name:
+                agent_name = resolve_identifier(body.get("name") or "")
+                with self.agents_lock:
+                    if (database, schema, agent_name) in self.agents:
+                        return self._send_json(409, {"message": f"Agent {agent_name} already exists"})
+                    self.agents[(database, schema, agent_name)] = body
+                return self._send_json(200, {"status": f"Agent {agent_name} successfully created."})
+        self._send_json(404, {"message": f"Unknown path {path}"})
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if self._inject_faults():
+            return
+        match = AGENTS_PATH.match(parsed.path)
+        if not match or match.group(4):
+            return self._send_json(404, {"message": f"Unknown path {parsed.path}"})
+
+        database, schema, name, _ = _agent_path_groups(match)
+        if name:
+            with self.agents_lock:
+                agent = self.agents.get((database, schema, name))
+            if agent is None:
+                return self._send_json(404, {"message": f"Agent {name} does not exist"})
+            return self._send_json_cacheable(dict(agent, name=name))
+
+        query = parse_qs(parsed.query)
+        offset = int(query.get("offset", ["0"])[0])
+        limit = query.get("limit", [None])[0]
+        with self.agents_lock:
+            agents = [
+                dict(agent, name=key[2], database_name=key[0], schema_name=key[1])
+                for key, agent in sorted(self.agents.items())
+                if key[0] == database and key[1] == schema
+            ]
+        agents = agents[offset:offset + int(limit)] if limit is not None else agents[offset:]
+        self._send_json_cacheable(agents)
+
+    def do_PUT(self):
+        path = urlparse(self.path).path
+        body = self._read_json()
+        if self._inject_faults():
+            return
+        match = AGENTS_PATH.match(path)
+        if not match or not match.group(3) or match.group(4):
+            return self._send_json(404, {"message": f"Unknown path {path}"})
+        database, schema, name, _ = _agent_path_groups(match)
+        with self.agents_lock:
+            if (database, schema, name) not in self.agents:
+                return self._send_json(404, {"message": f"Agent {name} does not exist"})
+            self.agents[(database, schema, name)] = body
+        self._send_json(200, {"status": f"Agent {name} successfully updated."})
+
+    def do_DELETE(self):
+        path = urlparse(self.path).path
+        if self._inject_faults():
+            return
+        match = AGENTS_PATH.match(path)
+        if not match or not match.group(3) or match.group(4):
+            return self._send_json(404, {"message": f"Unknown path {path}"})
+        database, schema, name, _ = _agent_path_groups(match)
+        with self.agents_lock:
+            if self.agents.pop((database, schema, name), None) is None:
+                return self._send_json(404, {"message": f"Agent {name} does not exist"})
+        self._send_json(200, {"status": f"Agent {name} successfully dropped."})
+
+
+class MockCortexServer:
+    """
+    Threaded mock Cortex server that can run in the background of a test or benchmark
+
+    Args:
+        config: MockCortexConfig (defaults to synthetic streams with no faults)
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+    """
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        handler = type("BoundMockCortexHandler", (MockCortexHandler,), {
+            "config": config or MockCortexConfig(),
+            "agents": {},
+            "agents_lock": threading.Lock(),
+            "threads": {},
+        })
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+# Example usage
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local mock of the Cortex REST APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--agent-stream", help="Recorded agent:run SSE body to replay")
+    parser.add_argument("--analyst-stream", help="Recorded analyst/message SSE body to replay")
+    parser.add_argument("--text-tokens", type=int, default=200, help="Text deltas in synthetic agent streams")
+    parser.add_argument("--token-rate", type=float, default=None, help="Events per second (default: unthrottled)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before response headers")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--disconnect-rate", type=float, default=0.0)
+    parser.add_argument("--event-ids", action="store_true", help="Emit SSE ids and honour Last-Event-ID")
+    args = parser.parse_args()
+
+    config = MockCortexConfig(
+        agent_events=load_recorded_events(args.agent_stream) if args.agent_stream
+        else synthetic_agent_events(text_tokens=args.text_tokens),
+        analyst_events=load_recorded_events(args.analyst_stream) if args.analyst_stream else None,
+        token_rate=args.token_rate,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        disconnect_rate=args.disconnect_rate,
+        event_ids=args.event_ids
+    )
+    server = MockCortexServer(config, host=args.host, port=args.port)
+    print(f"Mock Cortex server listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
@@ -0,0 +1,120 @@
+# Accumulators that assemble streamed Cortex deltas into final messages
+# Deltas are appended to lists and joined once, so building a long answer
+# is linear in its size instead of re-copying the string on every delta
+
+class TextAccumulator:
+    """
+    Append-only text buffer backed by a list of fragments
+    """
+
+    def __init__(self, text=""):
+        self._parts = [text] if text else []
+        self._length = len(text)
+        self._joined = text
+
+    def append(self, delta):
+        if delta:
+            self._parts.append(delta)
+            self._length += len(delta)
+            self._joined = None
+
+    def set(self, text):
+        """
+        Replace the accumulated text (e.g. with a final, non-delta event)
+        """
+        self._parts = [text] if text else []
+        self._length = len(text)
+        self._joined = text
+
+    def value(self):
+        if self._joined is None:
+            self._joined = "".join(self._parts)
+            # Collapse the fragments so later appends start from one part
+            self._parts = [self._joined]
+        return self._joined
+
+    def __len__(self):
+        return self._length
+
+    def __bool__(self):
+        return self._length > 0
+
+    def __str__(self):
+        return self.value()
+
+
+class AgentMessageAccumulator:
+    """
+    Collects text and thinking deltas from a Cortex Agent stream
+    """
+
+    def __init__(self):
+        self.text = TextAccumulator()
+        self.thinking = TextAccumulator()
+
+    def result(self):
+        """
+        Return the assembled assistant message in the agent:run message format
+        """
+        content = []
+        if self.thinking:
+            content.append({"type": "thinking", "thinking": {"text": self.thinking.value()}})
+        if self.text:
+            content.append({"type": "text", "text": self.text.value()})
+        return {"role": "assistant", "content": content}
+
+
+class AnalystMessageAccumulator:
+    """
+    Collects content deltas from a Cortex Analyst stream, per content index
+    and per suggestion index
+    """
+
+    def __init__(self):
+        self._blocks = {}
+        self.warnings = []
+        self.response_metadata = {}
+
+    def _block(self, index, content_type):
+        block = self._blocks.get(index)
+        if block is None:
+            block = {"type": content_type, "content": TextAccumulator(), "suggestions": {}}
+            self._blocks[index] = block
+        return block
+
+    def add_text(self, index, delta):
+        self._block(index, "text")["content"].append(delta)
+
+    def add_sql(self, index, delta):
+        self._block(index, "sql")["content"].append(delta)
+
+    def add_suggestion(self, index, suggestion_index, delta):
+        suggestions = self._block(index, "suggestions")["suggestions"]
+        accumulator = suggestions.get(suggestion_index)
+        if accumulator is None:
+            accumulator = suggestions[suggestion_index] = TextAccumulator()
+        accumulator.append(delta)
+
+    def result(self):
+        """
+        Return the assembled response in the same shape as a non-streaming
+        analyst/message response
+        """
+        content = []
+        for index in sorted(self._blocks):
+            block = self._blocks[index]
+            if block["type"] == "text":
+                content.append({"type": "text", "text": block["content"].value()})
+            elif block["type"] == "sql":
+                content.append({"type": "sql", "statement": block["content"].value()})
+            elif block["type"] == "suggestions":
+                suggestions = block["suggestions"]
+                content.append({
+                    "type": "suggestions",
+                    "suggestions": [suggestions[i].value() for i in sorted(suggestions)]
+                })
+        return {
+            "message": {"role": "analyst", "content": content},
+            "warnings": self.warnings,
+            "response_metadata": self.response_metadata
+        }
@@ -0,0 +1,170 @@
+# Route inline agent specs to persisted agent objects
+# A spec run through AgentRouter is stored once as an agent object (created or
+# updated when its digest is new) and later runs use the lightweight
+# agents/{name}:run endpoint instead of sending the full tool config inline
+
+import threading
+
+from cortex_client import get_default_client
+from run_cortex_agent_creation import create_cortex_agent
+from run_cortex_agent_update import update_cortex_agent
+from run_cortex_agent_with_agent import run_agent_object
+from run_cortex_agent_without_agent_creation import run_cortex_agent
+
+# Statuses from create meaning an agent with that name is already stored
+AGENT_EXISTS_STATUSES = (409,)
+
+
+class AgentRouter:
+    """
+    Run AgentSpecs through persisted agent objects, falling back to inline agent:run
+
+    Unnamed specs are stored under a content-addressed name
+    (`{name_prefix}_{digest[:16]}`), so an agent that already exists with that
+    name has the same definition and is used as is. Named specs are updated in
+    place the first time this router sees a new digest for them (created if the
+    update returns 404). If an agent cannot be stored, the spec is run inline
+    from then on.
+
+    Args:
+        token: Bearer token for authentication
+        account_url: Snowflake account URL
+        database: Database where routed agents are stored
+        schema: Schema where routed agents are stored
+        client: Optional CortexClient to reuse (defaults to the shared pooled client)
+        name_prefix: Prefix for the names of unnamed specs' agents
+        inline_runs: Runs of a spec sent inline before it is persisted (0 persists on first use)
+    """
+
+    def __init__(self, token, account_url, database="HOL2_DB", schema="HOL2_SCHEMA", client=None,
+                 name_prefix="SPEC_AGENT", inline_runs=0):
+        self.token = token
+        self.account_url = account_url
+        self.database = database
+        self.schema = schema
+        self.client = client or get_default_client()
+        self.name_prefix = name_prefix
+        self.inline_runs = inline_runs
+        # (agent name, digest) -> agent name, or None when the spec could not be persisted
+        self._agents = {}
+        # agent name -> digest of the definition last stored under it
+        self._stored = {}
+        self._runs = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def agent_name(self, spec):
+        """
+        Return the agent object name a spec is stored under
+        """
+        return spec.name or f"{self.name_prefix}_{spec.digest()[:16]}"
+
+    def _name_lock(self, name):
+        with self._lock:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def _known(self, key):
+        # True if the spec was routed before and its agent still holds this definition
+        if key not in self._agents:
+            return False
+        name, digest = key
+        return self._agents[key] is None or self._stored.get(name) == digest
+
+    def _persist(self, spec, name):
+        # Store the spec under `name` and return whether it is usable
+        kwargs = dict(client=self.client, account_url=self.account_url,
+                      database=self.database, schema=self.schema, spec=spec)
+        if spec.name:
+            response = update_cortex_agent(self.token, name, None, None, None, **kwargs)
+            if response.status_code != 404:
+                return response.ok
+        response = create_cortex_agent(self.token, name, None, None, None, **kwargs)
+        return response.ok or response.status_code in AGENT_EXISTS_STATUSES
+
+    def ensure_agent(self, spec):
+        """
+        Create or update the agent object for a spec if its name or digest is new
+
+        Specs are tracked by (agent name, digest), so named specs that share a
+        definition still get one agent each.
+
+        Returns:
+            str: The agent name, or None if the spec has to be run inline
+        """
+        digest = spec.digest()
+        name = self.agent_name(spec)
+        key = (name, digest)
+        if self._known(key):
+            return self._agents[key]
+        # Serialize writes per agent name so concurrent runs store each definition once
+        with self._name_lock(name):
+            if self._known(key):
+                return self._agents[key]
+            stored = self._stored.get(name) == digest or self._persist(spec, name)
+            with self._lock:
+                if stored:
+                    self._stored[name] = digest
+                self._agents[key] = name if stored else None
+            return self._agents[key]
+
+    def forget(self, spec):
+        """
+        Drop what the router knows about a spec so the next run re-checks its agent
+        """
+        digest = spec.digest()
+        name = self.agent_name(spec)
+        with self._lock:
+            self._agents.pop((name, digest), None)
+            if self._stored.get(name) == digest:
+                del self._stored[name]
+
+    def _count_run(self, key):
+        with self._lock:
+            runs = self._runs.get(key, 0) + 1
+            self._runs[key] = runs
+        return runs
+
+    def run(self, spec, user_message, thread_id=None, parent_message_id=None, metrics=None):
+        """
+        Run a spec, through its agent object when it can be persisted
+
+        Args:
+            spec: AgentSpec to run
+            user_message: The user's query/message to send to the agent
+            thread_id: Optional thread ID (agent object runs only)
+            parent_message_id: Optional parent message ID for thread_id
+            metrics: Optional RunMetrics to record connect and header timing into
+
+        Returns:
+            The streaming response, with `cortex_route` set to "object" or "inline"
+        """
+        name = None
+        if self._count_run((self.agent_name(spec), spec.digest())) > self.inline_runs:
+            name = self.ensure_agent(spec)
+
+        if name is not None:
+            tool_choice = spec.run_payload(None).get("tool_choice")
+            response = self._run_object(name, user_message, thread_id, parent_message_id,
+                                        tool_choice, metrics)
+            if response.status_code == 404:
+                # The stored agent was dropped elsewhere; store it again once
+                response.close()
+                self.forget(spec)
+                name = self.ensure_agent(spec)
+                if name is not None:
+                    response = self._run_object(name, user_message, thread_id, parent_message_id,
+                                                tool_choice, metrics)
+            if name is not None:
+                response.cortex_route = "object"
+                return response
+
+        response = run_cortex_agent(self.token, user_message, self.account_url, None, None,
+                                    client=self.client, metrics=metrics, spec=spec)
+        response.cortex_route = "inline"
+        return response
+
+    def _run_object(self, name, user_message, thread_id, parent_message_id, tool_choice, metrics):
+        return run_agent_object(self.token, name, user_message, self.database, self.schema,
+                                self.account_url, thread_id=thread_id,
+                                parent_message_id=parent_message_id, tool_choice=tool_choice,
+                                client=self.client, metrics=metrics)
@@ -0,0 +1,267 @@
+# Incremental Server-Sent Events decoder for Cortex streaming responses
+# Follows the WHATWG event-stream parsing rules: works on raw byte chunks,
+# accepts LF, CRLF and CR line endings, joins multi-line data fields and
+# tracks id / retry fields
+
+import hashlib
+import json
+from dataclasses import dataclass
+
+import requests
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# Event types that end a Cortex stream; a stream that stops before one was interrupted
+TERMINAL_EVENTS = ("done", "error")
+
+# Errors raised by iter_content when the connection drops mid-stream
+STREAM_ERRORS = (requests.exceptions.ChunkedEncodingError, requests.exceptions.ConnectionError)
+
+
+class StreamInterruptedError(Exception):
+    """
+    Raised when an interrupted stream could not be resumed
+    """
+
+
+@dataclass
+class SSEEvent:
+    """
+    A single dispatched Server-Sent Event
+
+    Args:
+        event: Event type (defaults to "message" when the stream omits it)
+        data: Event payload, multi-line data fields joined with newlines
+        id: Last event ID seen on the stream when this event was dispatched
+        retry: Reconnection time in milliseconds, if the stream set one
+    """
+    event: str = "message"
+    data: str = ""
+    id: str = None
+    retry: int = None
+
+    def json(self):
+        """
+        Decode the event data as JSON
+        """
+        return json.loads(self.data)
+
+
+class SSEDecoder:
+    """
+    Incremental event-stream decoder
+
+    Feed it raw byte chunks as they arrive; it returns the events completed by
+    each chunk and keeps any partial line buffered until the next one.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._event_type = ""
+        self._data = []
+        self._has_data = False
+        self.last_event_id = None
+        self.retry = None
+
+    def feed(self, chunk):
+        """
+        Decode a chunk of bytes and return the list of completed events
+
+        Args:
+            chunk: Raw bytes read from the response body
+        """
+        if not chunk:
+            return []
+        buffer = self._buffer
+        buffer += chunk
+
+        events = []
+        start = 0
+        length = len(buffer)
+        while start < length:
+            # Find the next line terminator (LF, CR or CRLF)
+            lf = buffer.find(b"\n", start)
+            cr = buffer.find(b"\r", start, lf if lf != -1 else length)
+            if cr != -1:
+                # A trailing CR may be the first half of a CRLF split across chunks
+                if cr == length - 1:
+                    break
+                end = cr
+                next_start = cr + 2 if buffer[cr + 1] == 0x0A else cr + 1
+            elif lf != -1:
+                end = lf
+                next_start = lf + 1
+            else:
+                break
+
+            event = self._process_line(bytes(buffer[start:end]))
+            if event is not None:
+                events.append(event)
+            start = next_start
+
+        del buffer[:start]
+        return events
+
+    def close(self):
+        """
+        Discard anything left pending when the stream ends
+
+        Per the event-stream rules an event is only dispatched by its
+        terminating blank line, so a truncated final event is dropped rather
+        than delivered as if it were complete.
+        """
+        self._buffer.clear()
+        self._event_type = ""
+        self._data = []
+        self._has_data = False
+
+    def _process_line(self, line):
+        # Blank line dispatches the pending event
+        if not line:
+            return self._dispatch()
+
+        # Comment line
+        if line[0] == 0x3A:
+            return None
+
+        colon = line.find(b":")
+        if colon == -1:
+            field = line
+            value = b""
+        else:
+            field = line[:colon]
+            value = line[colon + 1:]
+            if value[:1] == b" ":
+                value = value[1:]
+
+        if field == b"data":
+            self._data.append(value.decode("utf-8", errors="replace"))
+            self._has_data = True
+        elif field == b"event":
+            self._event_type = value.decode("utf-8", errors="replace")
+        elif field == b"id":
+            if b"\x00" not in value:
+                self.last_event_id = value.decode("utf-8", errors="replace")
+        elif field == b"retry":
+            if value.isdigit():
+                self.retry = int(value)
+        return None
+
+    def _dispatch(self):
+        if not self._has_data:
+            self._event_type = ""
+            return None
+        event = SSEEvent(
+            event=self._event_type or "message",
+            data="\n".join(self._data),
+            id=self.last_event_id,
+            retry=self.retry
+        )
+        self._event_type = ""
+        self._data = []
+        self._has_data = False
+        return event
+
+
+def iter_sse_events(response, chunk_size=DEFAULT_CHUNK_SIZE, max_resumes=3):
+    """
+    Yield SSEEvent objects from a streaming requests.Response
+
+    Responses from CortexClient.stream() are resumed when the connection drops
+    before a terminal event (see iter_resumable_sse_events).
+
+    Args:
+        response: Streaming response (requested with stream=True)
+        chunk_size: Maximum number of bytes read from the socket per iteration
+        max_resumes: Reconnection attempts for resumable responses
+    """
+    if hasattr(response, "reconnect") and response.status_code == 200:
+        yield from iter_resumable_sse_events(response, chunk_size, max_resumes)
+        return
+
+    decoder = SSEDecoder()
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        for event in decoder.feed(chunk):
+            yield event
+    decoder.close()
+
+
+def _event_digest(digest, event):
+    digest.update(event.event.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(event.data.encode("utf-8"))
+    digest.update(b"\0")
+
+
+def iter_resumable_sse_events(response, chunk_size=DEFAULT_CHUNK_SIZE, max_resumes=3,
+                              terminal_events=TERMINAL_EVENTS):
+    """
+    Yield SSEEvent objects, reconnecting when the connection drops before a terminal event
+
+    If the stream carries SSE ids the request is reissued with Last-Event-ID
+    and the server continues after the last delivered event; this also covers
+    a body that ends cleanly before a terminal event. Without ids, only a
+    transport error on a replayable request (see ResumableResponse.replayable)
+    is retried: the request is sent again and the events already delivered are
+    skipped; the skipped prefix must match what was delivered, or the replay is
+    rejected. Non-idempotent requests such as POST agent:run are never replayed,
+    and a body that ends cleanly without ids simply ends the iteration.
+
+    Args:
+        response: ResumableResponse from CortexClient.stream()
+        chunk_size: Maximum number of bytes read from the socket per iteration
+        max_resumes: Maximum number of reconnections
+        terminal_events: Event types that mark the end of the stream
+
+    Raises:
+        StreamInterruptedError: If the stream could not be resumed
+    """
+    delivered = 0
+    delivered_digest = hashlib.sha1()
+    last_event_id = None
+    skip = 0
+    replay_digest = None
+    resumes = 0
+
+    while True:
+        decoder = SSEDecoder()
+        error = None
+        try:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                for event in decoder.feed(chunk):
+                    if skip:
+                        # Replayed event that was already delivered
+                        skip -= 1
+                        _event_digest(replay_digest, event)
+                        if not skip and replay_digest.digest() != delivered_digest.digest():
+                            raise StreamInterruptedError("Replayed stream differs from the events already delivered")
+                        continue
+                    delivered += 1
+                    _event_digest(delivered_digest, event)
+                    if event.id is not None:
+                        last_event_id = event.id
+                    yield event
+                    if event.event in terminal_events:
+                        return
+        except STREAM_ERRORS as e:
+            error = e
+        decoder.close()
+
+        if last_event_id is None:
+            if error is None:
+                # The server ended the body and gave no id to resume from
+                return
+            if not getattr(response, "replayable", False):
+                raise StreamInterruptedError(
+                    f"Stream interrupted after {delivered} events; the request cannot be replayed"
+                ) from error
+        if resumes >= max_resumes:
+            raise StreamInterruptedError(f"Stream interrupted after {delivered} events") from error
+        resumes += 1
+        if last_event_id is not None:
+            response.reconnect(last_event_id)
+            skip = 0
+        else:
+            response.reconnect()
+            skip = delivered
+            replay_digest = hashlib.sha1()
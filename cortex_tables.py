@@ -0,0 +1,237 @@
+# Columnar decoding of Cortex result sets (response.table events)
+# Turns the row-oriented JSON result set into one array per column, with
+# optional conversion to Arrow and spilling of large tables to Parquet/CSV
+
+import csv
+import decimal
+import os
+import re
+import tempfile
+
+try:
+    import pyarrow
+    import pyarrow.csv
+    import pyarrow.parquet
+except ImportError:
+    # Optional: only needed for to_arrow() and Parquet files
+    pyarrow = None
+
+
+def _to_int(value):
+    return None if value is None else int(value)
+
+
+def _to_float(value):
+    return None if value is None else float(value)
+
+
+def _to_decimal(value):
+    # Via str so float inputs keep their shortest repr instead of binary noise
+    return None if value is None else decimal.Decimal(str(value))
+
+
+def _to_bool(value):
+    if value is None or isinstance(value, bool):
+        return value
+    return str(value).lower() in ("true", "1")
+
+
+DECIMAL_TYPE = re.compile(r"decimal128\((\d+),\s*(\d+)\)")
+
+# Written for NULL cells in CSV spill files, so NULL and empty text stay distinct
+CSV_NULL = "\\N"
+
+
+def _converter(column_type):
+    """
+    Return (converter, arrow type name) for a Snowflake rowType entry
+    """
+    type_name = column_type.get('type', 'text').lower()
+    if type_name == 'fixed':
+        scale = column_type.get('scale') or 0
+        if scale:
+            # Exact decimals: money and NUMBER(p, s) values must not go through float
+            precision = min(column_type.get('precision') or 38, 38)
+            return _to_decimal, f"decimal128({precision}, {scale})"
+        return _to_int, 'int64'
+    if type_name == 'real':
+        return _to_float, 'float64'
+    if type_name == 'boolean':
+        return _to_bool, 'bool'
+    # Text, dates, timestamps and semi-structured values are kept as strings
+    return None, 'string'
+
+
+def _load_converter(arrow_type):
+    # Converter for values read back from a CSV spill file
+    if DECIMAL_TYPE.fullmatch(arrow_type):
+        return _to_decimal
+    return {'int64': _to_int, 'float64': _to_float, 'bool': _to_bool}.get(arrow_type)
+
+
+def _require_pyarrow():
+    if pyarrow is None:
+        raise ImportError("pyarrow is required for Arrow/Parquet support (pip install pyarrow)")
+
+
+def _arrow_type(arrow_type):
+    match = DECIMAL_TYPE.fullmatch(arrow_type)
+    if match:
+        return pyarrow.decimal128(int(match.group(1)), int(match.group(2)))
+    return pyarrow.type_for_alias(arrow_type)
+
+
+class ColumnarTable:
+    """
+    A result set stored as one list per column
+
+    Args:
+        names: Column names
+        types: Arrow type name per column ('int64', 'float64', 'decimal128(p, s)', 'bool' or 'string')
+        columns: One list of values per column
+    """
+
+    def __init__(self, names, types, columns):
+        self.names = list(names)
+        self.types = list(types)
+        self.columns = list(columns)
+        self.num_rows = len(self.columns[0]) if self.columns else 0
+
+    @classmethod
+    def from_result_set(cls, result_set):
+        """
+        Decode a result_set ({"resultSetMetaData": {"rowType": [...]}, "data": [[...], ...]})
+        """
+        row_type = result_set.get('resultSetMetaData', {}).get('rowType', [])
+        data = result_set.get('data') or []
+        names = [column.get('name', f"COLUMN_{i}") for i, column in enumerate(row_type)]
+        types = []
+        # Transpose once; each column is then converted in a single pass
+        columns = [list(column) for column in zip(*data)] if data else [[] for _ in names]
+        for i, column_type in enumerate(row_type):
+            converter, arrow_type = _converter(column_type)
+            types.append(arrow_type)
+            if converter is not None:
+                columns[i] = list(map(converter, columns[i]))
+        return cls(names, types, columns)
+
+    def __len__(self):
+        return self.num_rows
+
+    def column(self, name):
+        return self.columns[self.names.index(name)]
+
+    def to_dict(self):
+        """
+        Return {column name: values}
+        """
+        return dict(zip(self.names, self.columns))
+
+    def to_arrow(self):
+        """
+        Return the table as a pyarrow.Table (requires pyarrow)
+        """
+        _require_pyarrow()
+        arrays = [pyarrow.array(column, type=_arrow_type(arrow_type))
+                  for column, arrow_type in zip(self.columns, self.types)]
+        return pyarrow.Table.from_arrays(arrays, names=self.names)
+
+    def write_parquet(self, path):
+        _require_pyarrow()
+        pyarrow.parquet.write_table(self.to_arrow(), path)
+
+    def write_csv(self, path):
+        """
+        Write the table as CSV, with NULL cells written as CSV_NULL (a text value
+        that is literally \\N reads back as NULL; use Parquet to keep it)
+        """
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.names)
+            for row in zip(*self.columns):
+                writer.writerow([CSV_NULL if value is None else value for value in row])
+
+
+class SpilledTable:
+    """
+    A result set that was written to a local Parquet or CSV file instead of kept in memory
+
+    Args:
+        path: File holding the table
+        file_format: 'parquet' or 'csv'
+        names: Column names
+        types: Arrow type name per column
+        num_rows: Number of rows written
+    """
+
+    def __init__(self, path, file_format, names, types, num_rows):
+        self.path = path
+        self.file_format = file_format
+        self.names = names
+        self.types = types
+        self.num_rows = num_rows
+
+    def __len__(self):
+        return self.num_rows
+
+    def to_arrow(self):
+        _require_pyarrow()
+        if self.file_format == 'parquet':
+            return pyarrow.parquet.read_table(self.path)
+        column_types = {name: _arrow_type(arrow_type)
+                        for name, arrow_type in zip(self.names, self.types)}
+        return pyarrow.csv.read_csv(self.path, convert_options=pyarrow.csv.ConvertOptions(
+            column_types=column_types, null_values=[CSV_NULL], strings_can_be_null=True))
+
+    def load(self):
+        """
+        Read the file back into a ColumnarTable
+        """
+        if pyarrow is not None:
+            columns = self.to_arrow().to_pydict()
+            return ColumnarTable(self.names, self.types, [columns[name] for name in self.names])
+        with open(self.path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader)
+            columns = [list(column) for column in zip(*reader)] or [[] for _ in self.names]
+        for i, arrow_type in enumerate(self.types):
+            converter = _load_converter(arrow_type) or (lambda value: value)
+            columns[i] = [None if value == CSV_NULL else converter(value) for value in columns[i]]
+        return ColumnarTable(self.names, self.types, columns)
+
+
+class TableSpill:
+    """
+    Policy for writing large tables to disk as they are decoded
+
+    Args:
+        directory: Directory for spill files (defaults to the system temp directory)
+        min_rows: Tables with at least this many rows are spilled
+        file_format: 'parquet' or 'csv' (defaults to Parquet when pyarrow is installed)
+    """
+
+    def __init__(self, directory=None, min_rows=10_000, file_format=None):
+        if file_format is None:
+            file_format = 'parquet' if pyarrow is not None else 'csv'
+        if file_format == 'parquet':
+            _require_pyarrow()
+        elif file_format != 'csv':
+            raise ValueError(f"Unsupported spill format: {file_format}")
+        self.directory = directory or tempfile.gettempdir()
+        self.min_rows = min_rows
+        self.file_format = file_format
+
+    def apply(self, table):
+        """
+        Return the table unchanged, or a SpilledTable if it is large enough to spill
+        """
+        if table.num_rows < self.min_rows:
+            return table
+        os.makedirs(self.directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.directory, prefix="cortex_table_", suffix=f".{self.file_format}")
+        os.close(fd)
+        if self.file_format == 'parquet':
+            table.write_parquet(path)
+        else:
+            table.write_csv(path)
+        return SpilledTable(path, self.file_format, table.names, table.types, table.num_rows)
@@ -1,14 +1,17 @@
-import requests
 import json
 import os
 from dotenv import load_dotenv
 
+from cortex_client import get_default_client
+
 # Load environment variables from .env file
 load_dotenv()
 
 def create_cortex_agent(token, agent_name, semantic_view, 
                        search_service, 
-                       warehouse):
+                       warehouse, client=None,
+                       account_url="https://eq06761.ap-southeast-2.snowflakecomputing.com",
+                       database="HOL2_DB", schema="HOL2_SCHEMA", spec=None):
     """
     Create a Snowflake Cortex agent
     
@@ -18,10 +21,16 @@ def create_cortex_agent(token, agent_name, semantic_view,
         semantic_view: Path to the semantic view for the analyst tool
         search_service: Path to the search service
         warehouse: Warehouse name
+        client: Optional CortexClient to reuse (defaults to the shared pooled client)
+        account_url: Optional Snowflake account URL
+        database: Optional Database where the agent is stored
+        schema: Optional Schema where the agent is stored
+        spec: Optional AgentSpec whose definition is sent instead of the sample agent below
+            (semantic_view, search_service and warehouse are then ignored)
     """
     
     # API endpoint
-    api_endpoint = "https://eq06761.ap-southeast-2.snowflakecomputing.com/api/v2/databases/HOL2_DB/schemas/HOL2_SCHEMA/agents"
+    api_endpoint = f"{account_url}/api/v2/databases/{database}/schemas/{schema}/agents"
     
     # Request headers
     headers = {
@@ -30,6 +39,11 @@ def create_cortex_agent(token, agent_name, semantic_view,
         "Content-Type": "application/json"
     }
     
+    client = client or get_default_client()
+    if spec is not None:
+        # Send the spec's cached encoding with this agent's name
+        return client.post(api_endpoint, headers=headers, data=spec.definition_body(agent_name))
+    
     # Request body
     payload = {
         "name": agent_name,
@@ -92,7 +106,7 @@ def create_cortex_agent(token, agent_name, semantic_view,
     }
     
     # Send the request
-    response = requests.post(api_endpoint, headers=headers, json=payload)
+    response = client.post(api_endpoint, headers=headers, json=payload)
     return response
 
 # Example usage
@@ -1,22 +1,29 @@
-import requests
 import json
 import os
 from dotenv import load_dotenv
 
+from cortex_client import get_default_client
+
 # Load environment variables from .env file
 load_dotenv()
 
-def delete_cortex_agent(token, agent_name):
+def delete_cortex_agent(token, agent_name, client=None,
+                        account_url="https://eq06761.ap-southeast-2.snowflakecomputing.com",
+                        database="HOL2_DB", schema="HOL2_SCHEMA"):
     """
     Delete a Snowflake Cortex agent
     
     Args:
         token: Bearer token for authentication
         agent_name: Name of the agent to delete
+        client: Optional CortexClient to reuse (defaults to the shared pooled client)
+        account_url: Optional Snowflake account URL
+        database: Optional Database where the agent is stored
+        schema: Optional Schema where the agent is stored
     """
     
     # API endpoint - include agent name for deletion
-    api_endpoint = f"https://eq06761.ap-southeast-2.snowflakecomputing.com/api/v2/databases/HOL2_DB/schemas/HOL2_SCHEMA/agents/{agent_name}"
+    api_endpoint = f"{account_url}/api/v2/databases/{database}/schemas/{schema}/agents/{agent_name}"
     
     # Request headers
     headers = {
@@ -26,7 +33,8 @@ def delete_cortex_agent(token, agent_name):
     }
     
     # Send the DELETE request
-    response = requests.delete(api_endpoint, headers=headers)
+    client = client or get_default_client()
+    response = client.delete(api_endpoint, headers=headers)
     return response
 
 # Example usage
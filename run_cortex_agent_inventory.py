@@ -0,0 +1,205 @@
+# Snowflake Cortex Agents - Inventory and health check across accounts and schemas
+# Lists every agent in a set of (account, database, schema) targets and describes
+# each one concurrently, writing one consolidated JSON or CSV report with
+# per-target timing
+
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+from cortex_client import CortexClient
+from run_cortex_agent_list import get_agent_details, iter_cortex_agents
+from run_cortex_agent_reconcile import current_definition
+
+# Load environment variables from .env file
+load_dotenv()
+
+AGENT_FIELDS = ["account_url", "database", "schema", "name", "display_name", "comment", "owner",
+                "created_on", "orchestration_model", "tool_types", "status_code",
+                "describe_seconds", "error"]
+
+TARGET_FIELDS = ["account_url", "database", "schema", "agents", "healthy", "unhealthy",
+                 "list_seconds", "describe_seconds", "elapsed_seconds", "error"]
+
+def read_targets(targets_path):
+    """
+    Read (account_url, database, schema) targets from a CSV, JSON (array) or JSONL file
+
+    Each target may also name a `token_env` variable holding the token for its
+    account; otherwise SNOWFLAKE_TOKEN is used.
+    """
+    with open(targets_path, newline="", encoding="utf-8") as f:
+        if targets_path.endswith(".jsonl"):
+            rows = [json.loads(line) for line in f if line.strip()]
+        elif targets_path.endswith(".json"):
+            rows = json.load(f)
+        else:
+            rows = list(csv.DictReader(f))
+    return [row for row in rows if row.get("account_url") and row.get("database") and row.get("schema")]
+
+def parse_target(value):
+    """
+    Parse an ACCOUNT_URL,DATABASE,SCHEMA command-line target
+    """
+    account_url, database, schema = (part.strip() for part in value.rsplit(",", 2))
+    return {"account_url": account_url, "database": database, "schema": schema}
+
+def describe_agent(token, target, record, client):
+    """
+    Describe one agent and return a flat inventory row
+    """
+    row = {
+        "account_url": target["account_url"],
+        "database": target["database"],
+        "schema": target["schema"],
+        "name": record.name,
+        "display_name": record.display_name,
+        "comment": record.comment,
+        "owner": record.owner,
+        "created_on": record.created_on,
+        "orchestration_model": None,
+        "tool_types": [],
+        "status_code": None,
+        "error": None
+    }
+    start = time.perf_counter()
+    try:
+        response = get_agent_details(token, record.name, client=client,
+                                     account_url=target["account_url"],
+                                     database=target["database"], schema=target["schema"])
+        row["status_code"] = response.status_code
+        if response.status_code == 200:
+            definition = current_definition(response.json())
+            row["orchestration_model"] = definition.get("models", {}).get("orchestration")
+            row["tool_types"] = [tool.get("tool_spec", {}).get("type")
+                                 for tool in definition.get("tools", [])]
+        else:
+            row["error"] = response.text
+    except Exception as e:
+        # Record the failure instead of aborting the whole inventory
+        row["error"] = str(e)
+    row["describe_seconds"] = round(time.perf_counter() - start, 3)
+    return row
+
+def inventory_target(target, default_token, client, describe_pool, page_size=100):
+    """
+    List and describe every agent in one target
+
+    Returns:
+        tuple: (target summary with timings, list of agent rows)
+    """
+    token = os.getenv(target["token_env"]) if target.get("token_env") else default_token
+    summary = {field: target.get(field) for field in ("account_url", "database", "schema")}
+    summary.update({"agents": 0, "healthy": 0, "unhealthy": 0, "error": None})
+    rows = []
+    start = time.perf_counter()
+    futures = []
+    try:
+        # Describes start as soon as each agent is listed, while later pages are still loading
+        for record in iter_cortex_agents(token, page_size=page_size, client=client,
+                                         account_url=target["account_url"],
+                                         database=target["database"], schema=target["schema"]):
+            futures.append(describe_pool.submit(describe_agent, token, target, record, client))
+    except Exception as e:
+        summary["error"] = str(e)
+    summary["list_seconds"] = round(time.perf_counter() - start, 3)
+
+    for future in futures:
+        row = future.result()
+        rows.append(row)
+        summary["healthy" if row["status_code"] == 200 else "unhealthy"] += 1
+    summary["agents"] = len(rows)
+    summary["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+    summary["describe_seconds"] = round(summary["elapsed_seconds"] - summary["list_seconds"], 3)
+    return summary, rows
+
+def run_inventory(targets, token, concurrency=8, target_concurrency=4, page_size=100):
+    """
+    Inventory all agents across targets
+
+    Args:
+        targets: List of {"account_url", "database", "schema"[, "token_env"]} dicts
+        token: Default bearer token for targets without token_env
+        concurrency: Maximum number of describe requests in flight
+        target_concurrency: Maximum number of targets listed at once
+        page_size: Agents requested per list page
+
+    Returns:
+        dict: {"targets": [per-target summaries], "agents": [agent rows]}
+    """
+    report = {"targets": [], "agents": []}
+    accounts = {target["account_url"] for target in targets}
+    # Targets and describes use separate pools so listing workers never wait on their own pool
+    with CortexClient(pool_connections=max(len(accounts), 1),
+                      pool_maxsize=concurrency + target_concurrency) as client, \
+            ThreadPoolExecutor(max_workers=concurrency) as describe_pool, \
+            ThreadPoolExecutor(max_workers=target_concurrency) as target_pool:
+        futures = [target_pool.submit(inventory_target, target, token, client, describe_pool, page_size)
+                   for target in targets]
+        for future in futures:
+            summary, rows = future.result()
+            report["targets"].append(summary)
+            report["agents"].extend(rows)
+    return report
+
+def write_report(report, output_path):
+    """
+    Write the report as JSON, or as CSV (agents to output_path, targets to <name>_targets.csv)
+    """
+    if not output_path.endswith(".csv"):
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return
+
+    with open(output_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=AGENT_FIELDS)
+        writer.writeheader()
+        for row in report["agents"]:
+            writer.writerow(dict(row, tool_types=json.dumps(row["tool_types"])))
+    targets_path = f"{os.path.splitext(output_path)[0]}_targets.csv"
+    with open(targets_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=TARGET_FIELDS)
+        writer.writeheader()
+        writer.writerows(report["targets"])
+
+# Example usage
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inventory Cortex agents across accounts and schemas")
+    parser.add_argument("output", help="Report file (.csv or .json)")
+    parser.add_argument("--target", action="append", default=[], type=parse_target,
+                        help="ACCOUNT_URL,DATABASE,SCHEMA (repeatable)")
+    parser.add_argument("--targets-file", default=None,
+                        help="CSV, JSON or JSONL file with account_url, database, schema[, token_env]")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--target-concurrency", type=int, default=4)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    targets = list(args.target)
+    if args.targets_file:
+        targets.extend(read_targets(args.targets_file))
+    if not targets:
+        targets = [{"account_url": "https://eq06761.ap-southeast-2.snowflakecomputing.com",
+                    "database": "HOL2_DB", "schema": "HOL2_SCHEMA"}]
+
+    start = time.perf_counter()
+    report = run_inventory(
+        targets,
+        token=os.getenv("SNOWFLAKE_TOKEN"),
+        concurrency=args.concurrency,
+        target_concurrency=args.target_concurrency,
+        page_size=args.page_size
+    )
+    write_report(report, args.output)
+
+    for summary in report["targets"]:
+        status = f"error: {summary['error']}" if summary["error"] else \
+            f"{summary['agents']} agents, {summary['unhealthy']} unhealthy"
+        print(f"{summary['account_url']} {summary['database']}.{summary['schema']}: {status} "
+              f"(list {summary['list_seconds']}s, describe {summary['describe_seconds']}s)")
+    print(f"Inventoried {len(report['agents'])} agents in {len(report['targets'])} targets "
+          f"in {time.perf_counter() - start:.1f}s")
@@ -1,12 +1,17 @@
-import requests
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from dotenv import load_dotenv
 
+from cortex_client import CortexAPIError, get_default_client
+
 # Load environment variables from .env file
 load_dotenv()
 
-def list_cortex_agents(token, limit=None, offset=None):
+def list_cortex_agents(token, limit=None, offset=None, client=None,
+                       account_url="https://eq06761.ap-southeast-2.snowflakecomputing.com",
+                       database="HOL2_DB", schema="HOL2_SCHEMA"):
     """
     List Snowflake Cortex agents
     
@@ -14,10 +19,14 @@ def list_cortex_agents(token, limit=None, offset=None):
         token: Bearer token for authentication
         limit: (Optional) Maximum number of agents to return
         offset: (Optional) Number of agents to skip
+        client: (Optional) CortexClient to reuse (defaults to the shared pooled client)
+        account_url: (Optional) Snowflake account URL
+        database: (Optional) Database where the agent is stored
+        schema: (Optional) Schema where the agent is stored
     """
     
     # API endpoint for listing agents
-    api_endpoint = "https://eq06761.ap-southeast-2.snowflakecomputing.com/api/v2/databases/HOL2_DB/schemas/HOL2_SCHEMA/agents"
+    api_endpoint = f"{account_url}/api/v2/databases/{database}/schemas/{schema}/agents"
     
     # Request headers
     headers = {
@@ -34,20 +43,119 @@ def list_cortex_agents(token, limit=None, offset=None):
         params['offset'] = offset
     
     # Send the GET request
-    response = requests.get(api_endpoint, headers=headers, params=params)
+    client = client or get_default_client()
+    response = client.get(api_endpoint, headers=headers, params=params)
     return response
 
-def get_agent_details(token, agent_name):
+@dataclass
+class AgentRecord:
+    """
+    The listing fields of one agent, without the rest of the response
+
+    Args:
+        name: Agent name
+        database_name: Database where the agent is stored
+        schema_name: Schema where the agent is stored
+        display_name: Display name from the agent profile
+        comment: Agent comment
+        owner: Owning role
+        created_on: Creation timestamp as returned by the API
+    """
+    name: str
+    database_name: str = None
+    schema_name: str = None
+    display_name: str = None
+    comment: str = None
+    owner: str = None
+    created_on: str = None
+
+    @classmethod
+    def from_json(cls, agent, database=None, schema=None):
+        profile = agent.get("profile")
+        if isinstance(profile, str):
+            # Some responses carry the profile as a JSON string
+            try:
+                profile = json.loads(profile)
+            except json.JSONDecodeError:
+                profile = None
+        return cls(
+            name=agent.get("name"),
+            database_name=agent.get("database_name", database),
+            schema_name=agent.get("schema_name", schema),
+            display_name=(profile or {}).get("display_name"),
+            comment=agent.get("comment"),
+            owner=agent.get("owner"),
+            created_on=agent.get("created_on")
+        )
+
+def iter_cortex_agents(token, page_size=100, client=None, prefetch=True,
+                       account_url="https://eq06761.ap-southeast-2.snowflakecomputing.com",
+                       database="HOL2_DB", schema="HOL2_SCHEMA"):
+    """
+    Lazily yield every agent in a schema as AgentRecords, one page at a time
+    
+    While the caller works through a page, the next one is fetched on a
+    background thread. Only the current and next page are held in memory.
+    
+    Args:
+        token: Bearer token for authentication
+        page_size: (Optional) Number of agents requested per page
+        client: (Optional) CortexClient to reuse (defaults to the shared pooled client)
+        prefetch: (Optional) Set to False to fetch each page only when it is needed
+        account_url: (Optional) Snowflake account URL
+        database: (Optional) Database where the agents are stored
+        schema: (Optional) Schema where the agents are stored
+    
+    Raises:
+        CortexAPIError: If a page cannot be listed
+    """
+    client = client or get_default_client()
+    
+    def fetch_page(offset):
+        response = list_cortex_agents(token, limit=page_size, offset=offset, client=client,
+                                      account_url=account_url, database=database, schema=schema)
+        if response.status_code != 200:
+            raise CortexAPIError(response.status_code, response.text)
+        agents = response.json() if response.text.strip() else []
+        if isinstance(agents, dict):
+            agents = agents.get("data", [])
+        # Keep only the record fields so the raw page can be freed right away
+        return [AgentRecord.from_json(agent, database, schema) for agent in agents]
+    
+    pool = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        offset = 0
+        page = fetch_page(offset)
+        while page:
+            offset += len(page)
+            # A short page is the last one
+            has_more = len(page) >= page_size
+            next_page = pool.submit(fetch_page, offset) if pool and has_more else None
+            yield from page
+            if not has_more:
+                return
+            page = next_page.result() if next_page else fetch_page(offset)
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+def get_agent_details(token, agent_name, client=None,
+                      account_url="https://eq06761.ap-southeast-2.snowflakecomputing.com",
+                      database="HOL2_DB", schema="HOL2_SCHEMA"):
     """
     Get detailed information about a specific Cortex agent
     
     Args:
         token: Bearer token for authentication
         agent_name: Name of the agent to describe
+        client: (Optional) CortexClient to reuse (defaults to the shared pooled client)
+        account_url: (Optional) Snowflake account URL
+        database: (Optional) Database where the agent is stored
+        schema: (Optional) Schema where the agent is stored
     """
     
     # API endpoint for describing a specific agent
-    api_endpoint = f"https://eq06761.ap-southeast-2.snowflakecomputing.com/api/v2/databases/HOL2_DB/schemas/HOL2_SCHEMA/agents/{agent_name}"
+    api_endpoint = f"{account_url}/api/v2/databases/{database}/schemas/{schema}/agents/{agent_name}"
     
     # Request headers
     headers = {
@@ -57,41 +165,25 @@ def get_agent_details(token, agent_name):
     }
     
     # Send the GET request
-    response = requests.get(api_endpoint, headers=headers)
+    client = client or get_default_client()
+    response = client.get(api_endpoint, headers=headers)
     return response
 
 # Example usage
 if __name__ == "__main__":
     token = os.getenv("SNOWFLAKE_TOKEN")
     
-    # List all agents
+    # List all agents, page by page
     print("=== Listing all Cortex agents ===")
-    response = list_cortex_agents(token=token)
+    count = 0
+    for count, agent in enumerate(iter_cortex_agents(token=token), 1):
+        print(f"{count}. Agent Name: {agent.name or 'N/A'}")
+        print(f"   Display Name: {agent.display_name or 'N/A'}")
+        print(f"   Comment: {agent.comment or 'N/A'}")
+    print(f"\nFound {count} agents")
     
-    print(f"Status Code: {response.status_code}")
-    print(f"Response Headers: {dict(response.headers)}")
-    print(f"Response Text: {response.text}")
-    
-    # Try to parse JSON response if it exists
-    if response.text.strip():
-        try:
-            print("JSON Response:")
-            agents_data = response.json()
-            print(json.dumps(agents_data, indent=2))
-            
-            # If we have agents, show some details
-            if isinstance(agents_data, dict) and 'data' in agents_data:
-                agents = agents_data['data']
-                print(f"\nFound {len(agents)} agents:")
-                for i, agent in enumerate(agents, 1):
-                    print(f"{i}. Agent Name: {agent.get('name', 'N/A')}")
-                    print(f"   Display Name: {agent.get('profile', {}).get('display_name', 'N/A')}")
-                    print(f"   Comment: {agent.get('comment', 'N/A')}")
-                    print()
-        except json.JSONDecodeError:
-            print("Response is not valid JSON")
-    else:
-        print("Response is empty")
+    # For a single raw page use list_cortex_agents directly
+    # response = list_cortex_agents(token=token, limit=10)
     
     # Get details for a specific agent (if you want to test this)
     print("\n=== Getting details for a specific agent ===")
@@ -106,3 +198,8 @@ if __name__ == "__main__":
             print(json.dumps(specific_agent_response.json(), indent=2))
         except json.JSONDecodeError:
             print("Response is not valid JSON")
+    
+    # Repeated lookups can be served from an in-process cache; create/update/delete
+    # calls made through the same client invalidate the affected entries
+    # cached_client = CortexClient(cache=ResponseCache(ttl=300))
+    # get_agent_details(token=token, agent_name="custom_agent", client=cached_client)
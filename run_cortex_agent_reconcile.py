@@ -0,0 +1,320 @@
+# Snowflake Cortex Agents - Reconcile stored agents with spec files
+# Fetches the current definition of every desired agent concurrently, diffs it
+# against the spec and only creates, updates (or, with --prune, deletes) the
+# agents that differ. --dry-run prints the plan without changing anything
+
+import argparse
+import fnmatch
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+from cortex_agent_spec import AgentSpec, AgentSpecError
+from cortex_client import CortexClient
+from run_cortex_agent_creation import create_cortex_agent
+from run_cortex_agent_delete import delete_cortex_agent
+from run_cortex_agent_list import get_agent_details, iter_cortex_agents
+from run_cortex_agent_update import update_cortex_agent
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Fields of a described agent that belong to its definition; everything else
+# (created_on, owner, database_name, ...) is server-managed and never diffed
+DEFINITION_FIELDS = ("comment", "profile", "models", "experimental", "orchestration",
+                     "instructions", "tools", "tool_resources", "tool_choice")
+
+# Definition keys the service fills in with defaults when a spec leaves them out
+# (fnmatch patterns over dotted paths); they are not diffed unless the spec sets them
+SERVER_DEFAULT_KEYS = (
+    "models.orchestration",
+    "orchestration.budget",
+    "orchestration.budget.*",
+    "instructions.*",
+    "tools[*].tool_spec.description",
+    "tool_resources.*.max_results",
+    "tool_resources.*.execution_environment",
+    "tool_resources.*.execution_environment.*",
+)
+
+SPEC_EXTENSIONS = (".json", ".yaml", ".yml")
+
+def normalize_identifier(name):
+    """
+    Return the name Snowflake stores for an identifier: unquoted names are
+    upper-cased, double-quoted names are kept as written (without the quotes)
+    """
+    if len(name) >= 2 and name.startswith('"') and name.endswith('"'):
+        return name[1:-1].replace('""', '"')
+    return name.upper()
+
+def quote_identifier(name):
+    """
+    Return a stored agent name in a form that addresses exactly that agent
+    """
+    if re.fullmatch(r"[A-Z_][A-Z0-9_$]*", name):
+        return name
+    return '"' + name.replace('"', '""') + '"'
+
+def load_specs(paths):
+    """
+    Load desired agent specs from files and directories of .json/.yaml/.yml files
+
+    A spec without a "name" is named after its file.
+
+    Returns:
+        dict: Agent name -> AgentSpec
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if name.endswith(SPEC_EXTENSIONS))
+        else:
+            files.append(path)
+
+    specs = {}
+    for path in files:
+        try:
+            spec = AgentSpec.from_file(path)
+        except AgentSpecError as e:
+            raise AgentSpecError(f"{path}: {e}") from e
+        spec.name = spec.name or os.path.splitext(os.path.basename(path))[0]
+        if spec.name in specs:
+            raise AgentSpecError(f"{path}: agent '{spec.name}' is defined more than once")
+        specs[spec.name] = spec
+    return specs
+
+def current_definition(details):
+    """
+    Extract the definition fields from a get_agent_details response body
+    """
+    # Describe responses may carry the definition as a JSON string under agent_spec
+    agent_spec = details.get("agent_spec")
+    if isinstance(agent_spec, str):
+        try:
+            details = dict(details, **json.loads(agent_spec))
+        except json.JSONDecodeError:
+            pass
+    elif isinstance(agent_spec, dict):
+        details = dict(details, **agent_spec)
+    return {field: details[field] for field in DEFINITION_FIELDS if field in details}
+
+def _is_server_default(path):
+    return any(fnmatch.fnmatchcase(path, pattern) for pattern in SERVER_DEFAULT_KEYS)
+
+def diff_definitions(current, desired, path=""):
+    """
+    Structurally diff a current JSON value against the desired one
+
+    Keys are compared in both directions: a key the spec no longer declares is
+    reported with new None, so reconcile removes it from the stored agent. Only
+    keys matching SERVER_DEFAULT_KEYS are ignored when the server has them and
+    the spec does not.
+
+    Returns:
+        list: {"path", "old", "new"} for every differing leaf; a missing side is None
+    """
+    if isinstance(current, dict) and isinstance(desired, dict):
+        changes = []
+        for key in sorted(set(current) | set(desired), key=str):
+            key_path = f"{path}.{key}" if path else str(key)
+            if key not in desired:
+                if _is_server_default(key_path):
+                    continue
+                if isinstance(current[key], dict):
+                    # Descend so server defaults inside an omitted section are still ignored
+                    changes.extend(diff_definitions(current[key], {}, key_path))
+                    continue
+            changes.extend(diff_definitions(current.get(key), desired.get(key), key_path))
+        return changes
+    if isinstance(current, list) and isinstance(desired, list) and len(current) == len(desired):
+        changes = []
+        for index, (old, new) in enumerate(zip(current, desired)):
+            changes.extend(diff_definitions(old, new, f"{path}[{index}]"))
+        return changes
+    if current == desired:
+        return []
+    return [{"path": path, "old": current, "new": desired}]
+
+def fetch_agent(token, agent_name, client, account_url, database, schema):
+    """
+    Return (definition, error) for one agent; definition is None if it does not exist
+    """
+    try:
+        response = get_agent_details(token, agent_name, client=client, account_url=account_url,
+                                     database=database, schema=schema)
+    except Exception as e:
+        return None, str(e)
+    if response.status_code == 404:
+        return None, None
+    if response.status_code != 200:
+        return None, f"{response.status_code}: {response.text}"
+    return current_definition(response.json()), None
+
+def plan_reconcile(specs, current, errors=None, existing=(), prune=False):
+    """
+    Work out the action needed for every agent
+
+    Args:
+        specs: Agent name -> desired AgentSpec
+        current: Agent name -> current definition, or None if the agent does not exist
+        errors: Agent name -> error message for agents that could not be fetched
+        existing: Names of all stored agents (used with prune)
+        prune: Delete stored agents that have no spec
+
+    Returns:
+        list: {"agent", "action", "changes"} with action create, update, delete, unchanged or error
+    """
+    errors = errors or {}
+    plan = []
+    for name, spec in specs.items():
+        if name in errors:
+            plan.append({"agent": name, "action": "error", "changes": [], "error": errors[name]})
+            continue
+        definition = current.get(name)
+        if definition is None:
+            plan.append({"agent": name, "action": "create", "changes": []})
+            continue
+        changes = diff_definitions(definition, spec.definition)
+        plan.append({"agent": name, "action": "update" if changes else "unchanged", "changes": changes})
+    if prune:
+        # Listed names are already as stored; spec names are resolved the way Snowflake would
+        desired = {normalize_identifier(name) for name in specs}
+        for name in sorted(set(existing) - desired):
+            # Lower-case or special names were created quoted and must be deleted quoted
+            plan.append({"agent": quote_identifier(name), "action": "delete", "changes": []})
+    return plan
+
+def apply_action(token, action, spec, client, account_url, database, schema):
+    """
+    Issue the create/update/delete call for one planned action and record the outcome
+    """
+    kwargs = dict(client=client, account_url=account_url, database=database, schema=schema)
+    name = action["agent"]
+    try:
+        if action["action"] == "create":
+            response = create_cortex_agent(token, name, None, None, None, spec=spec, **kwargs)
+        elif action["action"] == "update":
+            response = update_cortex_agent(token, name, None, None, None, spec=spec, **kwargs)
+        else:
+            response = delete_cortex_agent(token, name, **kwargs)
+    except Exception as e:
+        action["error"] = str(e)
+        return action
+    action["status_code"] = response.status_code
+    if not response.ok:
+        action["error"] = response.text
+    return action
+
+def reconcile(specs, token, account_url, database="HOL2_DB", schema="HOL2_SCHEMA",
+              prune=False, dry_run=False, concurrency=8):
+    """
+    Bring the stored agents in database.schema in line with `specs`
+
+    Args:
+        specs: Agent name -> desired AgentSpec
+        token: Bearer token for authentication
+        account_url: Snowflake account URL
+        database: Database where the agents are stored
+        schema: Schema where the agents are stored
+        prune: Delete stored agents that have no spec
+        dry_run: Only compute the plan
+        concurrency: Maximum number of requests in flight
+
+    Returns:
+        list: The plan (see plan_reconcile); applied actions also carry status_code/error
+    """
+    with CortexClient(pool_connections=1, pool_maxsize=concurrency) as client, \
+            ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # Fetch every desired agent's current definition concurrently
+        futures = {name: pool.submit(fetch_agent, token, name, client, account_url, database, schema)
+                   for name in specs}
+        current, errors = {}, {}
+        for name, future in futures.items():
+            current[name], error = future.result()
+            if error is not None:
+                errors[name] = error
+
+        existing = ()
+        if prune:
+            existing = [agent.name for agent in iter_cortex_agents(
+                token, client=client, account_url=account_url, database=database, schema=schema)]
+
+        plan = plan_reconcile(specs, current, errors, existing, prune)
+        if dry_run:
+            return plan
+
+        # Apply only the actions that change something; deletes run last and only
+        # once every create and update succeeded
+        writes = [action for action in plan if action["action"] in ("create", "update")]
+        futures = [pool.submit(apply_action, token, action, specs[action["agent"]], client,
+                               account_url, database, schema)
+                   for action in writes]
+        for future in futures:
+            future.result()
+
+        deletes = [action for action in plan if action["action"] == "delete"]
+        if any(action.get("error") for action in writes):
+            for action in deletes:
+                action["error"] = "Not deleted: a create or update failed"
+            return plan
+        futures = [pool.submit(apply_action, token, action, None, client, account_url, database, schema)
+                   for action in deletes]
+        for future in futures:
+            future.result()
+    return plan
+
+def format_report(plan, dry_run=False):
+    """
+    Render a plan as readable text, one line per agent plus one line per changed field
+    """
+    lines = []
+    for action in plan:
+        outcome = ""
+        if "status_code" in action:
+            outcome = f" -> {action['status_code']}"
+        if action.get("error"):
+            outcome += f" ({action['error']})"
+        lines.append(f"{action['action'].upper():9} {action['agent']}{outcome}")
+        for change in action["changes"]:
+            lines.append(f"    {change['path']}: {json.dumps(change['old'])} -> {json.dumps(change['new'])}")
+    counts = {}
+    for action in plan:
+        counts[action["action"]] = counts.get(action["action"], 0) + 1
+    summary = ", ".join(f"{count} {name}" for name, count in sorted(counts.items()))
+    lines.append(f"{'Dry run: ' if dry_run else ''}{summary or 'nothing to do'}")
+    return "\n".join(lines)
+
+# Example usage
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile stored Cortex agents with spec files")
+    parser.add_argument("specs", nargs="+", help="Spec files or directories of .json/.yaml/.yml specs")
+    parser.add_argument("--account-url", default="https://eq06761.ap-southeast-2.snowflakecomputing.com")
+    parser.add_argument("--database", default="HOL2_DB")
+    parser.add_argument("--schema", default="HOL2_SCHEMA")
+    parser.add_argument("--prune", action="store_true", help="Delete stored agents that have no spec")
+    parser.add_argument("--dry-run", action="store_true", help="Print the plan without applying it")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--report", default=None, help="Also write the plan as JSON to this file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    plan = reconcile(
+        specs=load_specs(args.specs),
+        token=os.getenv("SNOWFLAKE_TOKEN"),
+        account_url=args.account_url,
+        database=args.database,
+        schema=args.schema,
+        prune=args.prune,
+        dry_run=args.dry_run,
+        concurrency=args.concurrency
+    )
+    print(format_report(plan, dry_run=args.dry_run))
+    print(f"Finished in {time.perf_counter() - start:.1f}s")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(plan, f, indent=2)
@@ -1,14 +1,17 @@
-import requests
 import json
 import os
 from dotenv import load_dotenv
 
+from cortex_client import get_default_client
+
 # Load environment variables from .env file
 load_dotenv()
 
 def update_cortex_agent(token, agent_name, semantic_view, 
                        search_service, 
-                       warehouse):
+                       warehouse, client=None,
+                       account_url="https://eq06761.ap-southeast-2.snowflakecomputing.com",
+                       database="HOL2_DB", schema="HOL2_SCHEMA", spec=None):
     """
     Update a Snowflake Cortex agent
     
@@ -18,10 +21,16 @@ def update_cortex_agent(token, agent_name, semantic_view,
         semantic_view: Path to the semantic view for the analyst tool
         search_service: Path to the search service
         warehouse: Warehouse name
+        client: Optional CortexClient to reuse (defaults to the shared pooled client)
+        account_url: Optional Snowflake account URL
+        database: Optional Database where the agent is stored
+        schema: Optional Schema where the agent is stored
+        spec: Optional AgentSpec whose definition is sent instead of the sample agent below
+            (semantic_view, search_service and warehouse are then ignored)
     """
     
     # API endpoint - include agent name for updates
-    api_endpoint = f"https://eq06761.ap-southeast-2.snowflakecomputing.com/api/v2/databases/HOL2_DB/schemas/HOL2_SCHEMA/agents/{agent_name}"
+    api_endpoint = f"{account_url}/api/v2/databases/{database}/schemas/{schema}/agents/{agent_name}"
     
     # Request headers
     headers = {
@@ -30,6 +39,11 @@ def update_cortex_agent(token, agent_name, semantic_view,
         "Content-Type": "application/json"
     }
     
+    client = client or get_default_client()
+    if spec is not None:
+        # Send the spec's cached encoding with this agent's name
+        return client.put(api_endpoint, headers=headers, data=spec.definition_body(agent_name))
+    
     # Request body
     payload = {
         "name": agent_name,
@@ -89,7 +103,7 @@ def update_cortex_agent(token, agent_name, semantic_view,
     }
     
     # Send the request
-    response = requests.put(api_endpoint, headers=headers, json=payload)
+    response = client.put(api_endpoint, headers=headers, json=payload)
     return response
 
 # Example usage
@@ -1,133 +1,155 @@
 # Snowflake Cortex Agent Run API - With Agent Object
 # This script runs an existing Cortex agent object using the REST API
 
-import requests
 import json
 import os
 from dotenv import load_dotenv
 
+from cortex_client import CortexAPIError, get_default_client
+from cortex_events import (AgentEventStream, ChartEvent, ConsoleSink, DoneEvent, ErrorEvent,
+                           StatusEvent, TableEvent, TextDeltaEvent, TextEvent, ThinkingEvent,
+                           ToolResultEvent, ToolUseEvent, render_events)
+from cortex_metrics import LogExporter, RunMetrics
+
 # Load environment variables from .env file
 load_dotenv()
 
-def parse_sse_events_readable(response):
+def _render_error(event, stream, sink):
+    sink.line(f"❌ ERROR: {event.message}")
+    sink.line(f"   Error Code: {event.code}")
+    sink.line(f"   Request ID: {event.request_id}")
+
+def _render_status(event, stream, sink):
+    sink.line(f"Status: {event.message} ({event.status})")
+
+def _render_text_delta(event, stream, sink):
+    sink.write(event.text)
+
+def _render_text(event, stream, sink):
+    # Final text content
+    if event.text:
+        sink.line(f"\nResponse: {event.text}")
+
+def _render_thinking(event, stream, sink):
+    # Final thinking content
+    if event.text:
+        sink.line(f"\nAgent Thinking: {event.text[:200]}...")
+
+def _render_tool_use(event, stream, sink):
+    sink.line(f"\n🔧 Using tool: {event.name} ({event.type})")
+
+def _render_tool_result(event, stream, sink):
+    sink.line(f"✅ Tool {event.name} completed with status: {event.status}")
+
+def _render_chart(event, stream, sink):
+    sink.line(f"\n📊 Chart generated")
+
+def _render_table(event, stream, sink):
+    sink.line(f"\n📋 Table generated ({len(event.table)} rows x {len(event.table.names)} columns)")
+
+def _render_done(event, stream, sink):
+    # Print any remaining accumulated text before completion
+    if stream.text:
+        sink.line(f"\n\nFinal Response: {stream.text.value()}")
+    sink.line("\nResponse completed!")
+
+# Event class -> console renderer, looked up once per event instead of an if/elif chain
+READABLE_EVENT_RENDERERS = {
+    ErrorEvent: _render_error,
+    StatusEvent: _render_status,
+    TextDeltaEvent: _render_text_delta,
+    TextEvent: _render_text,
+    ThinkingEvent: _render_thinking,
+    ToolUseEvent: _render_tool_use,
+    ToolResultEvent: _render_tool_result,
+    ChartEvent: _render_chart,
+    TableEvent: _render_table,
+    DoneEvent: _render_done,
+}
+
+def parse_sse_events_readable(response, metrics=None, sink=None, table_spill=None):
     """
     Parse Server-Sent Events and display in a readable format
+    
+    Use AgentEventStream directly to consume the typed events without printing.
+    
+    Args:
+        response: Streaming response from the agent run
+        metrics: Optional RunMetrics that records event timings and is finished at the end
+        sink: Optional ConsoleSink to render into (defaults to buffered stdout)
+        table_spill: Optional TableSpill for writing large result tables to disk
+    
+    Returns:
+        dict: The assembled assistant message ({"role": "assistant", "content": [...]})
     """
-    current_event = None
-    response_text = ""
-    thinking_text = ""
-    
-    print("Cortex Agent Response:")
-    print("-" * 60)
-    
-    for line in response.iter_lines(decode_unicode=True):
-        if line:
-            if line.startswith('event:'):
-                current_event = line[6:].strip()
-                
-                # Display status updates
-                if current_event == 'response.status':
-                    continue  # Will handle in data section
-                elif current_event == 'response.text.delta':
-                    continue  # Will accumulate text
-                elif current_event == 'response.thinking.delta':
-                    continue  # Will accumulate thinking
-                elif current_event == 'done':
-                    continue  # Will handle completion
-                    
-            elif line.startswith('data:'):
-                data = line[5:].strip()
-                
-                # Check for stream completion
-                if current_event == 'done' and data == '[DONE]':
-                    # Print any remaining accumulated text before completion
-                    if response_text:
-                        print(f"\n\nFinal Response: {response_text}")
-                    print("\nResponse completed!")
-                    break
-                
-                # Parse JSON data
-                if data != '[DONE]':
-                    try:
-                        json_data = json.loads(data)
-                        
-                        # Handle different event types
-                        if current_event == 'error':
-                            error_code = json_data.get('code', 'Unknown')
-                            error_message = json_data.get('message', 'Unknown error')
-                            request_id = json_data.get('request_id', 'Unknown')
-                            print(f"❌ ERROR: {error_message}")
-                            print(f"   Error Code: {error_code}")
-                            print(f"   Request ID: {request_id}")
-                            
-                        elif current_event == 'response.status':
-                            status = json_data.get('status', '')
-                            message = json_data.get('message', '')
-                            print(f"Status: {message} ({status})")
-                            
-                        elif current_event == 'response.text.delta':
-                            text_delta = json_data.get('text', '')
-                            response_text += text_delta
-                            print(text_delta, end='', flush=True)
-                            
-                        elif current_event == 'response.thinking.delta':
-                            thinking_delta = json_data.get('text', '')
-                            thinking_text += thinking_delta
-                            
-                        elif current_event == 'response.text':
-                            # Final text content
-                            final_text = json_data.get('text', '')
-                            if final_text:
-                                print(f"\nResponse: {final_text}")
-                                response_text = final_text  # Update accumulated text
-                                
-                        elif current_event == 'response.thinking':
-                            # Final thinking content
-                            final_thinking = json_data.get('text', '')
-                            if final_thinking:
-                                print(f"\nAgent Thinking: {final_thinking[:200]}...")
-                                
-                        elif current_event == 'response.tool_use':
-                            tool_name = json_data.get('name', 'Unknown')
-                            tool_type = json_data.get('type', 'Unknown')
-                            print(f"\n🔧 Using tool: {tool_name} ({tool_type})")
-                            
-                        elif current_event == 'response.tool_result':
-                            tool_name = json_data.get('name', 'Unknown')
-                            status = json_data.get('status', 'Unknown')
-                            print(f"✅ Tool {tool_name} completed with status: {status}")
-                            
-                        elif current_event == 'response.chart':
-                            print(f"\n📊 Chart generated")
-                            
-                        elif current_event == 'response.table':
-                            print(f"\n📋 Table generated")
-                            
-                        elif current_event == 'response.status':
-                            status = json_data.get('status', '')
-                            message = json_data.get('message', '')
-                            print(f"📊 Status: {message} ({status})")
-                            
-                    except json.JSONDecodeError:
-                        # Not JSON, might be plain text
-                        if current_event == 'response.text.delta':
-                            response_text += data
-                            print(data, end='', flush=True)
+    sink = sink or ConsoleSink()
+    sink.line("Cortex Agent Response:")
+    sink.line("-" * 60)
+    
+    stream = AgentEventStream(response, metrics=metrics, table_spill=table_spill)
+    return render_events(stream, READABLE_EVENT_RENDERERS, sink).message
 
-def run_agent_object(token, agent_name, user_message, database, schema, 
-                    account_url, thread_id=None, parent_message_id=None, tool_choice=None):
+def build_thread_request(token, account_url, origin_application=None):
     """
-    Run an existing Cortex agent object
+    Build the endpoint, headers and body for creating a conversation thread
+    
+    Returns:
+        tuple: (api_endpoint, headers, payload)
+    """
+    
+    # API endpoint for threads
+    api_endpoint = f"{account_url}/api/v2/cortex/threads"
+    
+    # Request headers
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json"
+    }
+    
+    payload = {}
+    if origin_application is not None:
+        payload["origin_application"] = origin_application
+    
+    return api_endpoint, headers, payload
+
+def create_thread(token, account_url, origin_application=None, client=None):
+    """
+    Create a server-side conversation thread for agent runs
     
     Args:
         token: Bearer token for authentication
-        agent_name: Name of the existing agent to run
-        user_message: The user's query/message to send to the agent
-        database: Database name where the agent is stored
-        schema: Schema name where the agent is stored
         account_url: Snowflake account URL
-        thread_id: Optional thread ID for conversation continuity
-        parent_message_id: Optional parent message ID (required if thread_id is provided)
+        origin_application: Optional name of the calling application
+        client: Optional CortexClient to reuse (defaults to the shared pooled client)
+    
+    Returns:
+        The new thread ID
+    
+    Raises:
+        CortexAPIError: If the thread could not be created
+    """
+    
+    api_endpoint, headers, payload = build_thread_request(token, account_url, origin_application)
+    
+    # Send the request
+    client = client or get_default_client()
+    response = client.post(api_endpoint, headers=headers, json=payload)
+    if response.status_code != 200:
+        raise CortexAPIError(response.status_code, response.text)
+    
+    body = response.json()
+    if isinstance(body, dict):
+        return body.get("thread_id")
+    return body
+
+def build_agent_object_request(token, agent_name, user_message, database, schema,
+                               account_url, thread_id=None, parent_message_id=None,
+                               tool_choice=None):
+    """
+    Build the endpoint, headers and body for running an existing agent object
+    
+    Returns:
+        tuple: (api_endpoint, headers, payload)
     """
     
     # API endpoint for running an agent object
@@ -167,22 +189,48 @@ def run_agent_object(token, agent_name, user_message, database, schema,
     if tool_choice is not None:
         payload["tool_choice"] = tool_choice
     
-    # Send the request
-    response = requests.post(api_endpoint, headers=headers, json=payload, stream=True)
-    return response
+    return api_endpoint, headers, payload
 
-def run_agent_object_with_conversation_history(token, agent_name, conversation_history, 
-                                              database, schema, account_url, tool_choice=None):
+def run_agent_object(token, agent_name, user_message, database, schema, 
+                    account_url, thread_id=None, parent_message_id=None, tool_choice=None,
+                    client=None, metrics=None):
     """
-    Run an existing Cortex agent object with full conversation history
+    Run an existing Cortex agent object
     
     Args:
         token: Bearer token for authentication
         agent_name: Name of the existing agent to run
-        conversation_history: List of messages in the conversation
+        user_message: The user's query/message to send to the agent
         database: Database name where the agent is stored
         schema: Schema name where the agent is stored
         account_url: Snowflake account URL
+        thread_id: Optional thread ID for conversation continuity
+        parent_message_id: Optional parent message ID (required if thread_id is provided)
+        client: Optional CortexClient to reuse (defaults to the shared pooled client)
+        metrics: Optional RunMetrics to record connect and header timing into
+    """
+    
+    api_endpoint, headers, payload = build_agent_object_request(
+        token, agent_name, user_message, database, schema, account_url,
+        thread_id=thread_id, parent_message_id=parent_message_id, tool_choice=tool_choice
+    )
+    
+    # Send the request
+    client = client or get_default_client()
+    if metrics is not None:
+        metrics.start()
+    response = client.stream("POST", api_endpoint, headers=headers, json=payload)
+    if metrics is not None:
+        metrics.record_response(response)
+    return response
+
+def build_agent_history_request(token, agent_name, conversation_history, database,
+                                schema, account_url, tool_choice=None):
+    """
+    Build the endpoint, headers and body for running an agent object with history
+    
+    Returns:
+        tuple: (api_endpoint, headers, payload)
     """
     
     # API endpoint for running an agent object
@@ -203,8 +251,37 @@ def run_agent_object_with_conversation_history(token, agent_name, conversation_h
     if tool_choice is not None:
         payload["tool_choice"] = tool_choice
     
+    return api_endpoint, headers, payload
+
+def run_agent_object_with_conversation_history(token, agent_name, conversation_history, 
+                                              database, schema, account_url, tool_choice=None,
+                                              client=None, metrics=None):
+    """
+    Run an existing Cortex agent object with full conversation history
+    
+    Args:
+        token: Bearer token for authentication
+        agent_name: Name of the existing agent to run
+        conversation_history: List of messages in the conversation
+        database: Database name where the agent is stored
+        schema: Schema name where the agent is stored
+        account_url: Snowflake account URL
+        client: Optional CortexClient to reuse (defaults to the shared pooled client)
+        metrics: Optional RunMetrics to record connect and header timing into
+    """
+    
+    api_endpoint, headers, payload = build_agent_history_request(
+        token, agent_name, conversation_history, database, schema, account_url,
+        tool_choice=tool_choice
+    )
+    
     # Send the request
-    response = requests.post(api_endpoint, headers=headers, json=payload, stream=True)
+    client = client or get_default_client()
+    if metrics is not None:
+        metrics.start()
+    response = client.stream("POST", api_endpoint, headers=headers, json=payload)
+    if metrics is not None:
+        metrics.record_response(response)
     return response
 
 # Example usage
@@ -225,6 +302,9 @@ if __name__ == "__main__":
         "name": ["Analyst1", "Search1"]  # Specify which tools to use
     }
     
+    # Record per-phase latency (connect, headers, first status/tool/text, done)
+    metrics = RunMetrics(name=agent_name, exporters=[LogExporter()])
+    
     response = run_agent_object(
         token=token,
         agent_name=agent_name,
@@ -232,14 +312,16 @@ if __name__ == "__main__":
         database=database,
         schema=schema,
         account_url=account_url,
-        tool_choice=tool_choice
+        tool_choice=tool_choice,
+        metrics=metrics
     )
     
     print(f"Status Code: {response.status_code}")
     
     if response.status_code == 200:
         # Use readable format by default
-        parse_sse_events_readable(response)
+        parse_sse_events_readable(response, metrics=metrics)
+        print(f"\nTimings: {json.dumps(metrics.as_dict(), indent=2)}")
     else:
         print(f"Error: {response.status_code}")
         try:
@@ -1,154 +1,112 @@
-import requests
+import functools
 import json
 import os
 from dotenv import load_dotenv
 
+from cortex_agent_spec import AgentSpec
+from cortex_client import get_default_client
+from cortex_events import (AgentEventStream, ChartEvent, ConsoleSink, DoneEvent, StatusEvent,
+                           TableEvent, TextDeltaEvent, TextEvent, ThinkingEvent, ToolResultEvent,
+                           ToolUseEvent, render_events)
+from cortex_sse import iter_sse_events
+
 # Load environment variables from .env file
 load_dotenv()
 
-def parse_sse_events_readable(response):
+def _render_status(event, stream, sink):
+    sink.line(f"Status: {event.message} ({event.status})")
+
+def _render_text_delta(event, stream, sink):
+    sink.write(event.text)
+
+def _render_text(event, stream, sink):
+    # Final text content, shown only when nothing was streamed
+    if event.text and not stream.streamed_text:
+        sink.line(f"\nResponse: {event.text}")
+
+def _render_thinking(event, stream, sink):
+    # Final thinking content
+    if event.text:
+        sink.line(f"\nAgent Thinking: {event.text[:200]}...")
+
+def _render_tool_use(event, stream, sink):
+    sink.line(f"\nUsing tool: {event.name}")
+
+def _render_tool_result(event, stream, sink):
+    sink.line(f"Tool completed")
+
+def _render_chart(event, stream, sink):
+    sink.line(f"\nChart generated")
+
+def _render_table(event, stream, sink):
+    sink.line(f"\nTable generated ({len(event.table)} rows x {len(event.table.names)} columns)")
+
+def _render_done(event, stream, sink):
+    sink.line("\nResponse completed!")
+
+# Event class -> console renderer, looked up once per event instead of an if/elif chain
+READABLE_EVENT_RENDERERS = {
+    StatusEvent: _render_status,
+    TextDeltaEvent: _render_text_delta,
+    TextEvent: _render_text,
+    ThinkingEvent: _render_thinking,
+    ToolUseEvent: _render_tool_use,
+    ToolResultEvent: _render_tool_result,
+    ChartEvent: _render_chart,
+    TableEvent: _render_table,
+    DoneEvent: _render_done,
+}
+
+def parse_sse_events_readable(response, metrics=None, sink=None, table_spill=None):
     """
     Parse Server-Sent Events and display in a readable format
+    
+    Use AgentEventStream directly to consume the typed events without printing.
+    
+    Args:
+        response: Streaming response from the agent run
+        metrics: Optional RunMetrics that records event timings and is finished at the end
+        sink: Optional ConsoleSink to render into (defaults to buffered stdout)
+        table_spill: Optional TableSpill for writing large result tables to disk
+    
+    Returns:
+        dict: The assembled assistant message ({"role": "assistant", "content": [...]})
     """
-    current_event = None
-    response_text = ""
-    thinking_text = ""
-    
-    print("Cortex Agent Response:")
-    print("-" * 60)
-    
-    for line in response.iter_lines(decode_unicode=True):
-        if line:
-            if line.startswith('event:'):
-                current_event = line[6:].strip()
-                
-                # Display status updates
-                if current_event == 'response.status':
-                    continue  # Will handle in data section
-                elif current_event == 'response.text.delta':
-                    continue  # Will accumulate text
-                elif current_event == 'response.thinking.delta':
-                    continue  # Will accumulate thinking
-                elif current_event == 'done':
-                    continue  # Will handle completion
-                    
-            elif line.startswith('data:'):
-                data = line[5:].strip()
-                
-                # Check for stream completion
-                if current_event == 'done' and data == '[DONE]':
-                    print("\nResponse completed!")
-                    break
-                
-                # Parse JSON data
-                if data != '[DONE]':
-                    try:
-                        json_data = json.loads(data)
-                        
-                        # Handle different event types
-                        if current_event == 'response.status':
-                            status = json_data.get('status', '')
-                            message = json_data.get('message', '')
-                            print(f"Status: {message} ({status})")
-                            
-                        elif current_event == 'response.text.delta':
-                            text_delta = json_data.get('text', '')
-                            response_text += text_delta
-                            print(text_delta, end='', flush=True)
-                            
-                        elif current_event == 'response.thinking.delta':
-                            thinking_delta = json_data.get('text', '')
-                            thinking_text += thinking_delta
-                            
-                        elif current_event == 'response.text':
-                            # Final text content
-                            final_text = json_data.get('text', '')
-                            if final_text and not response_text:
-                                print(f"\nResponse: {final_text}")
-                                
-                        elif current_event == 'response.thinking':
-                            # Final thinking content
-                            final_thinking = json_data.get('text', '')
-                            if final_thinking:
-                                print(f"\nAgent Thinking: {final_thinking[:200]}...")
-                                
-                        elif current_event == 'response.tool_use':
-                            tool_name = json_data.get('name', 'Unknown')
-                            print(f"\nUsing tool: {tool_name}")
-                            
-                        elif current_event == 'response.tool_result':
-                            print(f"Tool completed")
-                            
-                        elif current_event == 'response.chart':
-                            print(f"\nChart generated")
-                            
-                        elif current_event == 'response.table':
-                            print(f"\nTable generated")
-                            
-                    except json.JSONDecodeError:
-                        # Not JSON, might be plain text
-                        if current_event == 'response.text.delta':
-                            response_text += data
-                            print(data, end='', flush=True)
+    sink = sink or ConsoleSink()
+    sink.line("Cortex Agent Response:")
+    sink.line("-" * 60)
+    
+    stream = AgentEventStream(response, metrics=metrics, table_spill=table_spill)
+    return render_events(stream, READABLE_EVENT_RENDERERS, sink).message
 
 def parse_sse_events_raw(response):
     """
     Parse Server-Sent Events from the streaming response (original version)
     """
-    current_event = None
-    
-    for line in response.iter_lines(decode_unicode=True):
-        if line:
-            if line.startswith('event:'):
-                current_event = line[6:].strip()
-                print(f"Event: {current_event}")
-                
-            elif line.startswith('data:'):
-                data = line[5:].strip()
-                print(f"Data: {data}")
-                
-                # Check for stream completion
-                if current_event == 'done' and data == '[DONE]':
-                    print("Stream completed")
-                    break
-                    
-                # Try to parse JSON data
-                if data != '[DONE]':
-                    try:
-                        json_data = json.loads(data)
-                        print(f"Parsed JSON: {json.dumps(json_data, indent=2)}")
-                    except json.JSONDecodeError:
-                        pass  # Not JSON, just print the raw data above
+    for event in iter_sse_events(response):
+        data = event.data
+        print(f"Event: {event.event}")
+        print(f"Data: {data}")
+        
+        # Check for stream completion
+        if event.event == 'done' and data == '[DONE]':
+            print("Stream completed")
+            break
+            
+        # Try to parse JSON data
+        if data != '[DONE]':
+            try:
+                json_data = event.json()
+                print(f"Parsed JSON: {json.dumps(json_data, indent=2)}")
+            except json.JSONDecodeError:
+                pass  # Not JSON, just print the raw data above
 
-def run_cortex_agent(token, user_message, account_url,
-                    semantic_view, 
-                    # semantic_model_file,
-                    search_service,
-                    warehouse="HOL2_WH"):
+@functools.lru_cache(maxsize=32)
+def default_agent_spec(semantic_view, search_service, warehouse="HOL2_WH"):
     """
-    Run a Cortex agent without creating an agent object
-    
-    Args:
-        token: Bearer token for authentication
-        user_message: The user's query/message to send to the agent
-        account_url: Snowflake account URL
-        semantic_view: Path to the semantic view for the analyst tool
-        search_service: Path to the search service
-        warehouse: Warehouse name
+    Return the AgentSpec used for inline runs, built and validated once per configuration
     """
-    
-    # API endpoint
-    api_endpoint = f"{account_url}/api/v2/cortex/agent:run"
-    
-    # Request headers
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/json",
-        "Content-Type": "application/json"
-    }
-    
-    # Request body
-    payload = {
+    return AgentSpec({
         "models": {
             "orchestration": "CLAUDE-3-5-SONNET"
         },
@@ -191,25 +149,98 @@ def run_cortex_agent(token, user_message, account_url,
                 # "semantic_model_file": f"{semantic_model_file}",
                 "execution_environment": {
                     "type": "warehouse",
-                    "warehouse": "HOL2_WH"
+                    "warehouse": warehouse
                 }
             }
-        },
-        "messages": [
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": f"{user_message}"
-                    }
-                ]
-            }
-        ]
+        }
+    })
+
+def _user_messages(user_message):
+    return [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": f"{user_message}"
+                }
+            ]
+        }
+    ]
+
+def _agent_run_headers(token):
+    return {
+        "Authorization": f"Bearer {token}",
+        "Accept": "application/json",
+        "Content-Type": "application/json"
     }
+
+def build_cortex_agent_request(token, user_message, account_url, semantic_view,
+                               search_service, warehouse="HOL2_WH"):
+    """
+    Build the endpoint, headers and body for an inline agent:run request
+    
+    Returns:
+        tuple: (api_endpoint, headers, payload)
+    """
+    
+    # API endpoint
+    api_endpoint = f"{account_url}/api/v2/cortex/agent:run"
+    
+    # Request body
+    spec = default_agent_spec(semantic_view, search_service, warehouse)
+    payload = spec.run_payload(_user_messages(user_message))
+    
+    return api_endpoint, _agent_run_headers(token), payload
+
+def build_agent_spec_request(token, spec, user_message, account_url):
+    """
+    Build the endpoint, headers and encoded body for an inline agent:run request from an AgentSpec
+    
+    Returns:
+        tuple: (api_endpoint, headers, body_bytes)
+    """
+    
+    # API endpoint
+    api_endpoint = f"{account_url}/api/v2/cortex/agent:run"
+    
+    # Only the messages are encoded per call; the spec's encoding is cached
+    body = spec.run_body(_user_messages(user_message))
+    
+    return api_endpoint, _agent_run_headers(token), body
+
+def run_cortex_agent(token, user_message, account_url,
+                    semantic_view, 
+                    # semantic_model_file,
+                    search_service,
+                    warehouse="HOL2_WH",
+                    client=None, metrics=None, spec=None):
+    """
+    Run a Cortex agent without creating an agent object
+    
+    Args:
+        token: Bearer token for authentication
+        user_message: The user's query/message to send to the agent
+        account_url: Snowflake account URL
+        semantic_view: Path to the semantic view for the analyst tool
+        search_service: Path to the search service
+        warehouse: Warehouse name
+        client: Optional CortexClient to reuse (defaults to the shared pooled client)
+        metrics: Optional RunMetrics to record connect and header timing into
+        spec: Optional AgentSpec to run instead of the default analyst/search configuration
+            (semantic_view, search_service and warehouse are then ignored)
+    """
+    
+    spec = spec or default_agent_spec(semantic_view, search_service, warehouse)
+    api_endpoint, headers, body = build_agent_spec_request(token, spec, user_message, account_url)
     
     # Send the request
-    response = requests.post(api_endpoint, headers=headers, json=payload, stream=True)
+    client = client or get_default_client()
+    if metrics is not None:
+        metrics.start()
+    response = client.stream("POST", api_endpoint, headers=headers, data=body)
+    if metrics is not None:
+        metrics.record_response(response)
     return response
 
 # Example usage
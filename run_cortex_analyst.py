@@ -1,112 +1,83 @@
-import requests
-import json
 import os
 from dotenv import load_dotenv
 
+from cortex_client import get_default_client
+from cortex_events import (AnalystEventStream, AnalystTextDeltaEvent, ConsoleSink, DoneEvent,
+                           ErrorEvent, ResponseMetadataEvent, SqlDeltaEvent, StatusEvent,
+                           SuggestionDeltaEvent, WarningsEvent, render_events)
+from cortex_history import AnalystHistory
+
 # Load environment variables from .env file
 load_dotenv()
 
-def parse_analyst_sse_events(response):
+def _render_analyst_status(event, stream, sink):
+    sink.line(f"Status: {event.status}")
+
+def _render_analyst_text_delta(event, stream, sink):
+    sink.write(event.text)
+
+def _render_analyst_sql_delta(event, stream, sink):
+    if event.statement:
+        sink.line(f"\nSQL: {event.statement}")
+
+def _render_analyst_suggestion_delta(event, stream, sink):
+    sink.write(f"\nSuggestion {event.suggestion_index + 1}: {event.text}")
+
+def _render_analyst_warnings(event, stream, sink):
+    for warning in event.warnings:
+        sink.line(f"\nWarning: {warning.get('message', '')}")
+
+def _render_analyst_metadata(event, stream, sink):
+    model_names = event.metadata.get('model_names', [])
+    question_category = event.metadata.get('question_category', '')
+    sink.line(f"\nMetadata - Models: {model_names}, Category: {question_category}")
+
+def _render_analyst_error(event, stream, sink):
+    sink.line(f"\nError: {event.message} (Code: {event.code})")
+
+def _render_analyst_done(event, stream, sink):
+    sink.line("\nAnalyst response completed!")
+
+# Event class -> console renderer, looked up once per event instead of an if/elif chain
+ANALYST_EVENT_RENDERERS = {
+    StatusEvent: _render_analyst_status,
+    AnalystTextDeltaEvent: _render_analyst_text_delta,
+    SqlDeltaEvent: _render_analyst_sql_delta,
+    SuggestionDeltaEvent: _render_analyst_suggestion_delta,
+    WarningsEvent: _render_analyst_warnings,
+    ResponseMetadataEvent: _render_analyst_metadata,
+    ErrorEvent: _render_analyst_error,
+    DoneEvent: _render_analyst_done,
+}
+
+def parse_analyst_sse_events(response, sink=None):
     """
     Parse Server-Sent Events from Cortex Analyst streaming response
+    
+    Use AnalystEventStream directly to consume the typed events without printing.
+    
+    Args:
+        response: Streaming response from send_analyst_message(stream=True)
+        sink: Optional ConsoleSink to render into (defaults to buffered stdout)
+    
+    Returns:
+        dict: The assembled response ({"message": ..., "warnings": ..., "response_metadata": ...})
     """
-    current_event = None
-    content_blocks = {}  # Track content by index
-    
-    print("Cortex Analyst Response:")
-    print("-" * 60)
-    
-    for line in response.iter_lines(decode_unicode=True):
-        if line:
-            if line.startswith('event:'):
-                current_event = line[6:].strip()
-                
-            elif line.startswith('data:'):
-                data = line[5:].strip()
-                
-                # Check for stream completion
-                if current_event == 'done':
-                    print("\nAnalyst response completed!")
-                    break
-                
-                # Parse JSON data
-                try:
-                    json_data = json.loads(data)
-                    
-                    # Handle different event types
-                    if current_event == 'status':
-                        status = json_data.get('status', '')
-                        print(f"Status: {status}")
-                        
-                    elif current_event == 'message.content.delta':
-                        index = json_data.get('index', 0)
-                        content_type = json_data.get('type', '')
-                        
-                        # Initialize content block if not exists
-                        if index not in content_blocks:
-                            content_blocks[index] = {'type': content_type, 'content': ''}
-                        
-                        if content_type == 'text':
-                            text_delta = json_data.get('text_delta', '')
-                            content_blocks[index]['content'] += text_delta
-                            print(text_delta, end='', flush=True)
-                            
-                        elif content_type == 'sql':
-                            statement_delta = json_data.get('statement_delta', '')
-                            content_blocks[index]['content'] += statement_delta
-                            if statement_delta:
-                                print(f"\nSQL: {statement_delta}")
-                                
-                        elif content_type == 'suggestions':
-                            suggestions_delta = json_data.get('suggestions_delta', {})
-                            suggestion_index = suggestions_delta.get('index', 0)
-                            suggestion_delta = suggestions_delta.get('suggestion_delta', '')
-                            
-                            if 'suggestions' not in content_blocks[index]:
-                                content_blocks[index]['suggestions'] = {}
-                            if suggestion_index not in content_blocks[index]['suggestions']:
-                                content_blocks[index]['suggestions'][suggestion_index] = ''
-                                
-                            content_blocks[index]['suggestions'][suggestion_index] += suggestion_delta
-                            print(f"\nSuggestion {suggestion_index + 1}: {suggestion_delta}", end='', flush=True)
-                    
-                    elif current_event == 'warnings':
-                        warnings = json_data.get('warnings', [])
-                        for warning in warnings:
-                            print(f"\nWarning: {warning.get('message', '')}")
-                    
-                    elif current_event == 'response_metadata':
-                        model_names = json_data.get('model_names', [])
-                        question_category = json_data.get('question_category', '')
-                        print(f"\nMetadata - Models: {model_names}, Category: {question_category}")
-                    
-                    elif current_event == 'error':
-                        error_message = json_data.get('message', '')
-                        error_code = json_data.get('code', '')
-                        print(f"\nError: {error_message} (Code: {error_code})")
-                        break
-                        
-                except json.JSONDecodeError:
-                    print(f"Raw data: {data}")
+    sink = sink or ConsoleSink()
+    sink.line("Cortex Analyst Response:")
+    sink.line("-" * 60)
+    
+    stream = AnalystEventStream(response)
+    return render_events(stream, ANALYST_EVENT_RENDERERS, sink).as_dict()
 
-def send_analyst_message(token, question, account_url, semantic_model_file=None, 
-                        semantic_view=None, semantic_model_spec=None, stream=True,
-                        conversation_history=None):
+def build_analyst_message_request(token, question, account_url, semantic_model_file=None,
+                                  semantic_view=None, semantic_model_spec=None, stream=True,
+                                  conversation_history=None):
     """
-    Send a message to Cortex Analyst
-    
-    Args:
-        token: Bearer token for authentication
-        question: The user's natural language question
-        account_url: Snowflake account URL
-        semantic_model_file: Path to YAML file on stage (e.g., "@stage/model.yaml")
-        semantic_view: Name of semantic view (e.g., "db.schema.view")
-        semantic_model_spec: Direct YAML specification as string
-        stream: Whether to use streaming response
-        conversation_history: List of previous messages for multi-turn conversation
+    Build the endpoint, headers and body for an analyst/message request
     
     Returns:
-        requests.Response: The response object
+        tuple: (api_endpoint, headers, payload)
     """
     
     # API endpoint
@@ -153,11 +124,47 @@ def send_analyst_message(token, question, account_url, semantic_model_file=None,
     else:
         raise ValueError("Must provide one of: semantic_model_file, semantic_view, or semantic_model_spec")
     
+    return api_endpoint, headers, payload
+
+def send_analyst_message(token, question, account_url, semantic_model_file=None, 
+                        semantic_view=None, semantic_model_spec=None, stream=True,
+                        conversation_history=None, client=None):
+    """
+    Send a message to Cortex Analyst
+    
+    Args:
+        token: Bearer token for authentication
+        question: The user's natural language question
+        account_url: Snowflake account URL
+        semantic_model_file: Path to YAML file on stage (e.g., "@stage/model.yaml")
+        semantic_view: Name of semantic view (e.g., "db.schema.view")
+        semantic_model_spec: Direct YAML specification as string
+        stream: Whether to use streaming response
+        conversation_history: List of previous messages for multi-turn conversation
+            (e.g. AnalystHistory.messages() to keep the payload bounded)
+        client: Optional CortexClient to reuse (defaults to the shared pooled client)
+    
+    Returns:
+        requests.Response: The response object
+    """
+    
+    api_endpoint, headers, payload = build_analyst_message_request(
+        token, question, account_url, semantic_model_file=semantic_model_file,
+        semantic_view=semantic_view, semantic_model_spec=semantic_model_spec,
+        stream=stream, conversation_history=conversation_history
+    )
+    
     # Send the request
-    response = requests.post(api_endpoint, headers=headers, json=payload, stream=stream)
+    client = client or get_default_client()
+    if stream:
+        # Resumable, so a dropped connection does not lose the answer
+        response = client.stream("POST", api_endpoint, headers=headers, json=payload)
+    else:
+        response = client.post(api_endpoint, headers=headers, json=payload)
     return response
 
-def send_analyst_feedback(token, request_id, positive, feedback_message, account_url):
+def send_analyst_feedback(token, request_id, positive, feedback_message, account_url,
+                          client=None):
     """
     Send feedback for a Cortex Analyst response
     
@@ -167,6 +174,7 @@ def send_analyst_feedback(token, request_id, positive, feedback_message, account
         positive: True for positive feedback, False for negative
         feedback_message: Optional feedback message
         account_url: Snowflake account URL
+        client: Optional CortexClient to reuse (defaults to the shared pooled client)
     
     Returns:
         requests.Response: The response object
@@ -191,7 +199,8 @@ def send_analyst_feedback(token, request_id, positive, feedback_message, account
         payload["feedback_message"] = feedback_message
     
     # Send the request
-    response = requests.post(api_endpoint, headers=headers, json=payload)
+    client = client or get_default_client()
+    response = client.post(api_endpoint, headers=headers, json=payload)
     return response
 
 def analyst_non_streaming_example(token, question, account_url, semantic_model_file):
@@ -302,7 +311,8 @@ if __name__ == "__main__":
     print("\n3. Multi-turn Conversation:")
     
     # First question
-    conversation_history = []
+    # Bounded history: suggestions stripped, repeated SQL sent once, old turns summarized
+    history = AnalystHistory(max_bytes=32 * 1024)
     
     response1 = send_analyst_message(
         token=token,
@@ -310,7 +320,7 @@ if __name__ == "__main__":
         account_url=account_url,
         semantic_model_file=semantic_model_file,
         stream=False,
-        conversation_history=conversation_history
+        conversation_history=history.messages()
     )
     
     if response1.status_code == 200:
@@ -318,11 +328,7 @@ if __name__ == "__main__":
         print("First question response received")
         
         # Add to conversation history
-        conversation_history.append({
-            "role": "user",
-            "content": [{"type": "text", "text": "What were our sales last month?"}]
-        })
-        conversation_history.append(result1.get('message', {}))
+        history.add_turn("What were our sales last month?", result1.get('message', {}))
         
         # Follow-up question
         response2 = send_analyst_message(
@@ -331,7 +337,7 @@ if __name__ == "__main__":
             account_url=account_url,
             semantic_model_file=semantic_model_file,
             stream=True,
-            conversation_history=conversation_history
+            conversation_history=history.messages()
         )
         
         if response2.status_code == 200:
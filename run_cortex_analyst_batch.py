@@ -0,0 +1,192 @@
+# Snowflake Cortex Analyst - Bulk question runner
+# Sends a file of questions (CSV or JSONL) to Cortex Analyst with bounded
+# concurrency and an optional rate limit, writing each result as it finishes
+
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dotenv import load_dotenv
+
+from cortex_client import CortexClient, RateLimiter
+from run_cortex_analyst import send_analyst_message
+
+# Load environment variables from .env file
+load_dotenv()
+
+RESULT_FIELDS = ["id", "question", "status_code", "request_id", "text", "sql",
+                 "suggestions", "error", "elapsed_seconds"]
+
+def read_questions(input_path, question_column="question", id_column="id"):
+    """
+    Lazily read question records from a CSV or JSONL file
+
+    Args:
+        input_path: Path to a .csv or .jsonl file
+        question_column: Column/key holding the question text
+        id_column: Column/key holding a record ID (defaults to the row number)
+    """
+    is_jsonl = input_path.endswith(".jsonl") or input_path.endswith(".json")
+    with open(input_path, newline="", encoding="utf-8") as f:
+        rows = (json.loads(line) for line in f if line.strip()) if is_jsonl else csv.DictReader(f)
+        for row_number, row in enumerate(rows, 1):
+            question = row.get(question_column)
+            if not question:
+                continue
+            yield {"id": row.get(id_column, row_number), "question": question}
+
+def summarize_analyst_result(result):
+    """
+    Flatten a non-streaming analyst/message response into text, SQL and suggestions
+    """
+    summary = {"request_id": result.get("request_id"), "text": "", "sql": "", "suggestions": []}
+    for block in result.get("message", {}).get("content", []):
+        block_type = block.get("type")
+        if block_type == "text":
+            summary["text"] += block.get("text", "")
+        elif block_type == "sql":
+            summary["sql"] += block.get("statement", "")
+        elif block_type == "suggestions":
+            summary["suggestions"].extend(block.get("suggestions", []))
+    return summary
+
+def run_question(record, token, account_url, client, limiter=None,
+                 semantic_model_file=None, semantic_view=None):
+    """
+    Send one question to Cortex Analyst and return a flat result record
+    """
+    if limiter is not None:
+        limiter.acquire()
+
+    result = {"id": record["id"], "question": record["question"], "status_code": None,
+              "request_id": None, "text": "", "sql": "", "suggestions": [], "error": None}
+    start = time.perf_counter()
+    try:
+        response = send_analyst_message(
+            token=token,
+            question=record["question"],
+            account_url=account_url,
+            semantic_model_file=semantic_model_file,
+            semantic_view=semantic_view,
+            stream=False,
+            client=client
+        )
+        result["status_code"] = response.status_code
+        if response.status_code == 200:
+            result.update(summarize_analyst_result(response.json()))
+        else:
+            result["error"] = response.text
+    except Exception as e:
+        # Record the failure instead of aborting the whole batch
+        result["error"] = str(e)
+    result["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+class ResultWriter:
+    """
+    Append results to a JSONL or CSV file, flushing after every record
+    """
+
+    def __init__(self, output_path):
+        self._file = open(output_path, "w", newline="", encoding="utf-8")
+        self._csv = None
+        if output_path.endswith(".csv"):
+            self._csv = csv.DictWriter(self._file, fieldnames=RESULT_FIELDS)
+            self._csv.writeheader()
+
+    def write(self, result):
+        if self._csv is not None:
+            row = dict(result, suggestions=json.dumps(result["suggestions"]))
+            self._csv.writerow(row)
+        else:
+            self._file.write(json.dumps(result) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def run_batch(input_path, output_path, token, account_url, semantic_model_file=None,
+              semantic_view=None, concurrency=8, rate=None, question_column="question"):
+    """
+    Run every question in input_path through Cortex Analyst
+
+    Args:
+        input_path: CSV or JSONL file of questions
+        output_path: Output file (.csv for CSV, anything else for JSONL)
+        token: Bearer token for authentication
+        account_url: Snowflake account URL
+        semantic_model_file: Path to YAML file on stage (e.g., "@stage/model.yaml")
+        semantic_view: Name of semantic view (e.g., "db.schema.view")
+        concurrency: Maximum number of requests in flight
+        rate: Optional maximum requests per second
+        question_column: Column/key holding the question text
+
+    Returns:
+        dict: Counts of succeeded and failed questions
+    """
+    counts = {"succeeded": 0, "failed": 0}
+    limiter = RateLimiter(rate) if rate else None
+
+    def record_done(futures, writer):
+        for future in futures:
+            result = future.result()
+            counts["failed" if result["error"] else "succeeded"] += 1
+            writer.write(result)
+
+    with CortexClient(pool_connections=1, pool_maxsize=concurrency) as client, \
+            ThreadPoolExecutor(max_workers=concurrency) as pool, \
+            ResultWriter(output_path) as writer:
+        pending = set()
+        for record in read_questions(input_path, question_column=question_column):
+            # Keep a bounded window of submitted questions so memory stays flat
+            if len(pending) >= concurrency * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                record_done(done, writer)
+            pending.add(pool.submit(
+                run_question, record, token, account_url, client, limiter,
+                semantic_model_file=semantic_model_file, semantic_view=semantic_view
+            ))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            record_done(done, writer)
+
+    return counts
+
+# Example usage
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a file of questions through Cortex Analyst")
+    parser.add_argument("input", help="CSV or JSONL file with a 'question' column/key")
+    parser.add_argument("output", help="Output file (.csv or .jsonl)")
+    parser.add_argument("--account-url", default="https://eq06761.ap-southeast-2.snowflakecomputing.com")
+    parser.add_argument("--semantic-model-file", default=None)
+    parser.add_argument("--semantic-view", default=None)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=None, help="Maximum requests per second")
+    parser.add_argument("--question-column", default="question")
+    args = parser.parse_args()
+
+    if not args.semantic_model_file and not args.semantic_view:
+        args.semantic_model_file = "@HOL2_DB.HOL2_SCHEMA.SEMANTIC_MODEL/revenue_timeseries.yaml"
+
+    start = time.perf_counter()
+    counts = run_batch(
+        input_path=args.input,
+        output_path=args.output,
+        token=os.getenv("SNOWFLAKE_TOKEN"),
+        account_url=args.account_url,
+        semantic_model_file=args.semantic_model_file,
+        semantic_view=args.semantic_view,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        question_column=args.question_column
+    )
+    elapsed = time.perf_counter() - start
+    print(f"Completed {counts['succeeded']} questions, {counts['failed']} failed in {elapsed:.1f}s")
@@ -0,0 +1,189 @@
+# Benchmark harness for the Cortex SSE parsers and the end-to-end streaming path
+# Feeds synthetic streams through each parser in-process, then streams the same
+# events from the local mock server, and saves the measurements as JSON
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from cortex_client import CortexClient
+from cortex_mock_server import (MockCortexConfig, MockCortexServer, format_sse_event,
+                                synthetic_agent_events, synthetic_analyst_events)
+from cortex_sse import iter_sse_events
+import run_cortex_agent_with_agent
+import run_cortex_agent_without_agent_creation
+import run_cortex_analyst
+
+AGENT_PARSERS = {
+    "agent_with_agent.parse_sse_events_readable": run_cortex_agent_with_agent.parse_sse_events_readable,
+    "agent_without_agent_creation.parse_sse_events_readable":
+        run_cortex_agent_without_agent_creation.parse_sse_events_readable,
+    "agent_without_agent_creation.parse_sse_events_raw": run_cortex_agent_without_agent_creation.parse_sse_events_raw,
+}
+ANALYST_PARSERS = {
+    "analyst.parse_analyst_sse_events": run_cortex_analyst.parse_analyst_sse_events,
+}
+
+class InMemoryResponse:
+    """
+    Minimal stand-in for a streaming requests.Response over a pre-built body
+    """
+
+    def __init__(self, body, network_chunk_size=16 * 1024):
+        self.body = body
+        self.network_chunk_size = network_chunk_size
+        self.status_code = 200
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        # Mimic the socket: hand out at most network_chunk_size bytes per read
+        step = min(chunk_size or self.network_chunk_size, self.network_chunk_size)
+        body = memoryview(self.body)
+        for start in range(0, len(body), step):
+            yield bytes(body[start:start + step])
+
+def build_agent_body(events, delta_size):
+    """
+    Encode a synthetic agent stream with roughly `events` events of `delta_size` characters
+    """
+    stream = synthetic_agent_events(text_tokens=max(events - 30, 1), token_text="x" * delta_size)
+    return b"".join(format_sse_event(event, data) for event, data in stream), len(stream)
+
+def build_analyst_body(events, delta_size, suggestions=5):
+    """
+    Encode a synthetic analyst stream with text, SQL and suggestion blocks
+    """
+    text_tokens = max(events * 2 // 3, 1)
+    sql_tokens = max(events - text_tokens - suggestions * 2 - 5, 1)
+    stream = synthetic_analyst_events(text_tokens=text_tokens, sql_tokens=sql_tokens, suggestions=suggestions)
+    filler = "x" * delta_size
+    body = []
+    for event, data in stream:
+        if event == "message.content.delta" and data["type"] == "text":
+            data = dict(data, text_delta=filler)
+        body.append(format_sse_event(event, data))
+    return b"".join(body), len(stream)
+
+def measure(parser, body, with_memory):
+    """
+    Run a parser over an in-memory body with stdout discarded
+
+    Returns:
+        tuple: (seconds, peak_memory_bytes or None)
+    """
+    sink = io.StringIO()
+    if with_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sink):
+        parser(InMemoryResponse(body))
+    elapsed = time.perf_counter() - start
+    peak = None
+    if with_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return elapsed, peak
+
+def bench_parsers(event_counts, delta_sizes, with_memory=True, repeat=1):
+    """
+    Benchmark every parser for every (event count, delta size) combination
+    """
+    results = []
+    for events in event_counts:
+        for delta_size in delta_sizes:
+            bodies = {
+                "agent": build_agent_body(events, delta_size),
+                "analyst": build_analyst_body(events, delta_size),
+            }
+            for kind, parsers in (("agent", AGENT_PARSERS), ("analyst", ANALYST_PARSERS)):
+                body, event_count = bodies[kind]
+                for name, parser in parsers.items():
+                    elapsed = min(measure(parser, body, False)[0] for _ in range(repeat))
+                    peak = measure(parser, body, True)[1] if with_memory else None
+                    result = {
+                        "benchmark": "parser",
+                        "parser": name,
+                        "events": event_count,
+                        "delta_size": delta_size,
+                        "bytes": len(body),
+                        "seconds": round(elapsed, 6),
+                        "events_per_sec": round(event_count / elapsed, 1),
+                        "mb_per_sec": round(len(body) / elapsed / 1e6, 3),
+                        "peak_memory_bytes": peak,
+                    }
+                    results.append(result)
+                    print(f"{name:60s} events={event_count:>8} delta={delta_size:>4} "
+                          f"{result['events_per_sec']:>12,.0f} ev/s {result['mb_per_sec']:>8.2f} MB/s")
+    return results
+
+def bench_end_to_end(events, delta_size, requests_count=5, token_rate=None):
+    """
+    Stream agent runs from the local mock server through the pooled client and SSE decoder
+    """
+    config = MockCortexConfig(
+        agent_events=synthetic_agent_events(text_tokens=max(events - 30, 1), token_text="x" * delta_size),
+        token_rate=token_rate
+    )
+    results = []
+    with MockCortexServer(config) as server, CortexClient() as client:
+        for _ in range(requests_count):
+            _, headers, payload = run_cortex_agent_without_agent_creation.build_cortex_agent_request(
+                "token", "benchmark", server.url, "DB.SCHEMA.VIEW", "DB.SCHEMA.SEARCH"
+            )
+            start = time.perf_counter()
+            response = client.post(f"{server.url}/api/v2/cortex/agent:run",
+                                   headers=headers, json=payload, stream=True)
+            headers_at = time.perf_counter()
+            first_token_at = None
+            event_count = 0
+            for event in iter_sse_events(response):
+                event_count += 1
+                if first_token_at is None and event.event == "response.text.delta":
+                    first_token_at = time.perf_counter()
+            elapsed = time.perf_counter() - start
+            results.append({
+                "benchmark": "end_to_end",
+                "events": event_count,
+                "delta_size": delta_size,
+                "token_rate": token_rate,
+                "seconds": round(elapsed, 6),
+                "time_to_headers": round(headers_at - start, 6),
+                "time_to_first_token": round(first_token_at - start, 6) if first_token_at else None,
+                "events_per_sec": round(event_count / elapsed, 1),
+            })
+    best = min(results, key=lambda r: r["seconds"])
+    print(f"{'end_to_end (mock server)':60s} events={best['events']:>8} delta={delta_size:>4} "
+          f"{best['events_per_sec']:>12,.0f} ev/s ttft={best['time_to_first_token']}s")
+    return results
+
+# Example usage
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Cortex SSE parsing and streaming throughput")
+    parser.add_argument("--events", type=int, nargs="+", default=[10_000, 100_000],
+                        help="Stream sizes in events (e.g. 10000 100000 1000000)")
+    parser.add_argument("--delta-sizes", type=int, nargs="+", default=[4, 64])
+    parser.add_argument("--repeat", type=int, default=3, help="Timing runs per case (best is kept)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc peak-memory pass")
+    parser.add_argument("--e2e-requests", type=int, default=5)
+    parser.add_argument("--token-rate", type=float, default=None,
+                        help="Throttle the mock server to measure time-to-first-token under pacing")
+    parser.add_argument("--output", default="sse_benchmark_results.json")
+    args = parser.parse_args()
+
+    results = bench_parsers(args.events, args.delta_sizes, with_memory=not args.no_memory, repeat=args.repeat)
+    for events in args.events:
+        results.extend(bench_end_to_end(events, args.delta_sizes[0], args.e2e_requests, args.token_rate))
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {len(results)} results to {args.output}")
@@ -65,12 +65,22 @@ CALL CORTEX_ANALYST_SQL(
 
 -- loop through a table (of which 1 column is the question) and call the stored procedure for each row
 -- to generate "GENERATED_SQL" and save to output_table
+-- Up to BATCH_SIZE CORTEX_ANALYST_SQL calls run concurrently as async child jobs, results are appended
+-- to OUTPUT_TABLE every CHUNK_SIZE rows. By default every call appends a fresh generation; with
+-- RESUME = TRUE an interrupted run picks up where it stopped: [ERROR] rows are deleted and retried and
+-- questions already present in OUTPUT_TABLE are skipped
+DROP PROCEDURE IF EXISTS GENERATE_SQL_ALL(STRING, STRING, STRING, STRING, STRING);  -- previous serial signature
+DROP PROCEDURE IF EXISTS GENERATE_SQL_ALL(STRING, STRING, STRING, STRING, STRING, NUMBER, NUMBER);
+
 CREATE OR REPLACE PROCEDURE GENERATE_SQL_ALL(
     INPUT_TABLE STRING,
     DB_NAME STRING,
     SCHEMA_NAME STRING,
     VIEW_NAME STRING,
-    OUTPUT_TABLE STRING
+    OUTPUT_TABLE STRING,
+    BATCH_SIZE INT DEFAULT 16,
+    CHUNK_SIZE INT DEFAULT 100,
+    RESUME BOOLEAN DEFAULT FALSE
 )
 RETURNS STRING
 LANGUAGE PYTHON
@@ -79,41 +89,74 @@ PACKAGES = ('snowflake-snowpark-python')
 HANDLER = 'generate_sql_all'
 AS
 $$
+from collections import deque
 from snowflake.snowpark import Session
 
-def generate_sql_all(session: Session, INPUT_TABLE: str, DB_NAME: str, SCHEMA_NAME: str, VIEW_NAME: str, OUTPUT_TABLE: str) -> str:
-    # Load the input data
-    df = session.sql(f"SELECT question, expected_sql FROM {INPUT_TABLE}")
+RESULT_COLUMNS = ["question", "expected_sql", "generated_sql"]
 
+def output_table_exists(session: Session, table_name: str) -> bool:
+    try:
+        session.table(table_name).limit(0).collect()
+        return True
+    except Exception:
+        return False
+
+def flush_rows(session: Session, rows: list, table_name: str) -> int:
+    if not rows:
+        return 0
+    session.create_dataframe(rows, schema=RESULT_COLUMNS).write.mode("append").save_as_table(table_name)
+    count = len(rows)
+    rows.clear()
+    return count
+
+def wait_for_call(question: str, expected_sql: str, job) -> tuple:
+    try:
+        generated_sql = job.result()[0][0]
+    except Exception as e:
+        # Capture error message instead of failing
+        generated_sql = f"[ERROR]: {str(e)}"
+    return (question, expected_sql, generated_sql)
+
+def generate_sql_all(session: Session, INPUT_TABLE: str, DB_NAME: str, SCHEMA_NAME: str, VIEW_NAME: str,
+                     OUTPUT_TABLE: str, BATCH_SIZE: int = 16, CHUNK_SIZE: int = 100,
+                     RESUME: bool = False) -> str:
+    batch_size = max(int(BATCH_SIZE or 1), 1)
+    chunk_size = max(int(CHUNK_SIZE or 1), 1)
+
+    # Load the input data; when resuming, skip questions already written by the interrupted run
+    query = f"SELECT question, expected_sql FROM {INPUT_TABLE} i"
+    if RESUME and output_table_exists(session, OUTPUT_TABLE):
+        # Drop failed rows first so those questions are retried instead of kept as [ERROR]
+        session.sql(f"DELETE FROM {OUTPUT_TABLE} WHERE STARTSWITH(generated_sql, '[ERROR]')").collect()
+        query += f" WHERE NOT EXISTS (SELECT 1 FROM {OUTPUT_TABLE} o WHERE o.question = i.question)"
+    df = session.sql(query)
+
+    in_flight = deque()
     result_rows = []
-
-    for row in df.collect():
-        question = row['QUESTION']
-        expected_sql = row['EXPECTED_SQL']
-
-        try:
-            # Call stored procedure
-            result = session.sql(
-                "CALL CORTEX_ANALYST_SQL(?, ?, ?, ?)",
-                params=[question, DB_NAME, SCHEMA_NAME, VIEW_NAME]
-            ).collect()
-
-            generated_sql = result[0][0]
-
-        except Exception as e:
-            # Capture error message instead of failing
-            generated_sql = f"[ERROR]: {str(e)}"
-
-        # Append result row
-        result_rows.append((question, expected_sql, generated_sql))
-
-    # Create a dataframe with results
-    result_df = session.create_dataframe(result_rows, schema=["question", "expected_sql", "generated_sql"])
-
-    # Append to the output table
-    result_df.write.mode("append").save_as_table(OUTPUT_TABLE)
-
-    return f"Inserted {len(result_rows)} rows into {OUTPUT_TABLE}"
+    inserted = 0
+
+    # Stream input rows instead of collecting the whole table
+    for row in df.to_local_iterator():
+        # Submit the stored procedure call without blocking
+        job = session.sql(
+            "CALL CORTEX_ANALYST_SQL(?, ?, ?, ?)",
+            params=[row['QUESTION'], DB_NAME, SCHEMA_NAME, VIEW_NAME]
+        ).collect_nowait()
+        in_flight.append((row['QUESTION'], row['EXPECTED_SQL'], job))
+
+        # Keep at most BATCH_SIZE calls running; wait for the oldest one
+        if len(in_flight) >= batch_size:
+            result_rows.append(wait_for_call(*in_flight.popleft()))
+
+        # Append finished rows in chunks so memory stays bounded
+        if len(result_rows) >= chunk_size:
+            inserted += flush_rows(session, result_rows, OUTPUT_TABLE)
+
+    while in_flight:
+        result_rows.append(wait_for_call(*in_flight.popleft()))
+    inserted += flush_rows(session, result_rows, OUTPUT_TABLE)
+
+    return f"Inserted {inserted} rows into {OUTPUT_TABLE}"
 $$;
 
 select * from SQL_QUESTIONS; -- QUESTION | EXPECTED_SQL
@@ -126,14 +169,32 @@ CALL GENERATE_SQL_ALL(
     'HOL2_DB',
     'HOL2_SCHEMA',
     'REVENUE',
-    'HOL2_DB.HOL2_SCHEMA.EVAL_RESULTS'
+    'HOL2_DB.HOL2_SCHEMA.EVAL_RESULTS',
+    16,     -- concurrent CORTEX_ANALYST_SQL calls
+    100,    -- rows per append to EVAL_RESULTS
+    FALSE   -- TRUE resumes an interrupted run instead of appending a new generation
 );
 
 
 -- sproc to call LLM to evaluate accuracy of the generated SQLs
+-- Result queries and CORTEX.COMPLETE judge calls are submitted asynchronously for up to MAX_CONCURRENCY
+-- rows at a time and collected as they finish; per-row verdicts are appended to OUTPUT_TBL when provided
+-- Expected-SQL results are cached in RESULT_CACHE_TBL, keyed by a hash of the normalized SQL and a
+-- freshness marker built from the last change time of every table the query reads (pass NULL to disable);
+-- queries calling CURRENT_DATE, RANDOM, UUID_STRING or similar functions are always re-run
+-- Judge outputs are cached in VERDICT_CACHE_TBL keyed by model, question and result fingerprints, and rows
+-- whose result sets are identical after canonical ordering are marked True without calling the LLM
+-- A local comparator (column matching, row multisets, numeric tolerance, renamed columns) marks the
+-- remaining clear matches True and empty results False; every other row is escalated to CORTEX.COMPLETE
+DROP PROCEDURE IF EXISTS evaluate_all_samples(STRING, STRING);  -- previous serial signature
+
 CREATE OR REPLACE PROCEDURE evaluate_all_samples(
     tbl_name STRING,
-    model_name STRING
+    model_name STRING,
+    output_tbl STRING DEFAULT NULL,
+    max_concurrency INT DEFAULT 8,
+    result_cache_tbl STRING DEFAULT 'EVAL_RESULT_CACHE',
+    verdict_cache_tbl STRING DEFAULT 'EVAL_VERDICT_CACHE'
 )
 RETURNS STRING
 LANGUAGE PYTHON
@@ -142,6 +203,11 @@ PACKAGES = ('snowflake-snowpark-python')
 HANDLER = 'main'
 AS
 $$
+import hashlib
+import json
+import math
+import re
+import time
 from snowflake.snowpark import Session
 from snowflake.snowpark import functions as F
 
@@ -165,68 +231,617 @@ Otherwise, answer "False".
 [The End of the Ground Truth Data]
 """
 
-def return_sql_result(session: Session, sql: str) -> str:
+VERDICT_COLUMNS = ["row_num", "question", "generated_sql", "expected_sql", "verdict", "judge_output", "status"]
+POLL_INTERVAL_SECONDS = 0.2
+FLUSH_EVERY = 100
+
+class AsyncValue:
+    """Resolved value wrapper so ready results and pending AsyncJobs share one interface"""
+    def __init__(self, value):
+        self.value = value
+
+    def is_done(self) -> bool:
+        return True
+
+    def result(self):
+        return self.value
+
+def submit_sql_result(session: Session, sql: str):
     try:
         result = (
             session.sql(sql.replace(";", ""))
             .limit(100)
             .select(F.to_varchar(F.array_agg(F.object_construct("*"))))
         )
-        return result.collect_nowait().result()[0][0]
+        return result.collect_nowait()
     except Exception as e:
-       return f"Error: {e}"
+        return AsyncValue(f"Error: {e}")
+
+def read_sql_result(job) -> str:
+    try:
+        result = job.result()
+        return result if isinstance(result, str) else result[0][0]
+    except Exception as e:
+        return f"Error: {e}"
+
+# String literals, quoted identifiers and $$ blocks are matched whole so their contents are never normalized
+SQL_TOKEN = re.compile(
+    r"""'(?:[^'\\]|\\.|'')*'|"(?:[^"]|"")*"|\$\$.*?\$\$|--[^\n]*|/\*.*?\*/|\s+|;|[^'"$;\s/-]+|.""",
+    re.S
+)
+
+def normalize_sql(sql: str) -> str:
+    # Drop comments, semicolons and whitespace differences outside quoted text; literals are kept verbatim
+    parts = []
+    for match in SQL_TOKEN.finditer(sql):
+        token = match.group(0)
+        if token == ";":
+            continue
+        if token.isspace() or token.startswith(("--", "/*")):
+            if not parts or parts[-1] == " ":
+                continue
+            token = " "
+        parts.append(token)
+    return "".join(parts).strip()
+
+# Functions whose value changes between runs; queries calling them are never cached
+NONDETERMINISTIC_SQL = re.compile(
+    r"\b(CURRENT_DATE|CURRENT_TIME|CURRENT_TIMESTAMP|LOCALTIME|LOCALTIMESTAMP|SYSDATE|"
+    r"SYSTIMESTAMP|GETDATE|RANDOM|RANDSTR|UNIFORM|NORMAL|SEQ1|SEQ2|SEQ4|SEQ8|UUID_STRING)\b",
+    re.I
+)
+
+def is_deterministic(sql: str) -> bool:
+    # Only code outside literals, quoted identifiers and comments is checked
+    for match in SQL_TOKEN.finditer(sql):
+        token = match.group(0)
+        if token.startswith(("'", '"', "$$", "--", "/*")):
+            continue
+        if NONDETERMINISTIC_SQL.search(token):
+            return False
+    return True
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def find_scanned_objects(node, found: set):
+    if isinstance(node, dict):
+        if node.get("operation") == "TableScan":
+            found.update(node.get("objects", []))
+        for value in node.values():
+            find_scanned_objects(value, found)
+    elif isinstance(node, list):
+        for value in node:
+            find_scanned_objects(value, found)
+
+def referenced_tables(session: Session, sql: str):
+    """Tables scanned by a query according to its plan, or None if it cannot be explained"""
+    try:
+        plan = session.sql(f"EXPLAIN USING JSON {sql}").collect()[0][0]
+    except Exception:
+        return None
+    found = set()
+    find_scanned_objects(json.loads(plan), found)
+    return sorted(found)
+
+def table_change_markers(session: Session, tables: list) -> dict:
+    """Last change commit time of every table, fetched 100 tables per query"""
+    markers = {}
+    for start in range(0, len(tables), 100):
+        batch = tables[start:start + 100]
+        columns = ", ".join(
+            f"SYSTEM$LAST_CHANGE_COMMIT_TIME('{table}')" for table in batch
+        )
+        try:
+            values = session.sql(f"SELECT {columns}").collect()[0]
+        except Exception:
+            continue
+        markers.update(zip(batch, values))
+    return markers
+
+def fetch_by_keys(session: Session, table_name: str, key_column: str, keys, columns: list, condition=None):
+    """Rows of table_name whose key_column is one of keys, looked up by joining a staged key list"""
+    keys = sorted(set(keys))
+    if not keys:
+        return []
+    table = session.table(table_name)
+    if condition is not None:
+        table = table.filter(condition)
+    staged = session.create_dataframe([[key] for key in keys], schema=["LOOKUP_KEY"])
+    return (
+        table.join(staged, table[key_column] == staged["LOOKUP_KEY"])
+        .select(*[table[column] for column in columns])
+        .collect()
+    )
+
+class ResultCache:
+    """Persistent cache of expected-SQL results keyed by normalized SQL hash and data freshness"""
+    def __init__(self, session: Session, table_name: str):
+        self.session = session
+        self.table_name = table_name
+        self.entries = {}
+        self.keys = {}
+        self.freshness = {}
+        self.pending = {}
+        self.hits = 0
+        if table_name:
+            session.sql(
+                f"CREATE TABLE IF NOT EXISTS {table_name} "
+                "(SQL_HASH STRING, FRESHNESS STRING, RESULT STRING, UPDATED_AT TIMESTAMP_LTZ)"
+            ).collect()
+
+    def prepare(self, sqls):
+        """Compute cache keys for all distinct SQL statements of this run and load their entries"""
+        if not self.table_name:
+            return
+        tables_by_hash = {}
+        for sql in set(sqls):
+            normalized = normalize_sql(sql)
+            if not is_deterministic(normalized):
+                continue
+            sql_hash = hash_text(normalized)
+            if sql_hash not in tables_by_hash:
+                tables_by_hash[sql_hash] = referenced_tables(self.session, normalized)
+            self.keys[sql] = sql_hash
+
+        all_tables = sorted({t for tables in tables_by_hash.values() if tables for t in tables})
+        markers = table_change_markers(self.session, all_tables)
+        for sql_hash, tables in tables_by_hash.items():
+            # Uncacheable if the plan or any table marker could not be read
+            if not tables or any(t not in markers for t in tables):
+                continue
+            self.freshness[sql_hash] = hash_text(
+                "|".join(f"{t}={markers[t]}" for t in tables)
+            )
+
+        # Only the entries of this run's cacheable statements are read
+        rows = fetch_by_keys(
+            self.session, self.table_name, "SQL_HASH", self.freshness, ["SQL_HASH", "FRESHNESS", "RESULT"]
+        )
+        for row in rows:
+            self.entries[row[0]] = (row[1], row[2])
+
+    def _key(self, sql: str):
+        sql_hash = self.keys.get(sql)
+        freshness = self.freshness.get(sql_hash) if sql_hash else None
+        return (sql_hash, freshness) if freshness else None
+
+    def get(self, sql: str):
+        key = self._key(sql)
+        if key is None:
+            return None
+        entry = self.entries.get(key[0])
+        if entry is not None and entry[0] == key[1]:
+            self.hits += 1
+            return entry[1]
+        return None
+
+    def put(self, sql: str, result: str):
+        key = self._key(sql)
+        if key is None or result.startswith("Error"):
+            return
+        self.entries[key[0]] = (key[1], result)
+        self.pending[key[0]] = (key[0], key[1], result)
+
+    def flush(self):
+        if not self.pending:
+            return
+        source = self.session.create_dataframe(
+            list(self.pending.values()), schema=["SQL_HASH", "FRESHNESS", "RESULT"]
+        )
+        target = self.session.table(self.table_name)
+        target.merge(
+            source,
+            target["SQL_HASH"] == source["SQL_HASH"],
+            [
+                F.when_matched().update({
+                    "FRESHNESS": source["FRESHNESS"],
+                    "RESULT": source["RESULT"],
+                    "UPDATED_AT": F.current_timestamp(),
+                }),
+                F.when_not_matched().insert({
+                    "SQL_HASH": source["SQL_HASH"],
+                    "FRESHNESS": source["FRESHNESS"],
+                    "RESULT": source["RESULT"],
+                    "UPDATED_AT": F.current_timestamp(),
+                }),
+            ],
+        )
+        self.pending.clear()
 
-def run_async_sql_complete(session: Session, model: str, prompt: str) -> str:
+def submit_sql_complete(session: Session, model: str, prompt: str):
     prompt = prompt.replace("'", "\\'")
     query = f"""SELECT
     TRIM(snowflake.cortex.complete('{model}',
     '{prompt}'))"""
-    return session.sql(query).collect_nowait().result()[0][0]
+    return session.sql(query).collect_nowait()
+
+def canonical_result(data: str):
+    """Result rows in a canonical order with sorted keys, or None if the data is not a JSON array"""
+    try:
+        rows = json.loads(data)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(rows, list):
+        return None
+    return json.dumps(sorted(json.dumps(row, sort_keys=True) for row in rows))
+
+# Plain numeric literals only: "NaN", "inf" and similar text are compared as strings
+NUMERIC_TEXT = re.compile(r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+
+def normalize_value(value):
+    """Comparable form of a JSON cell value: finite numbers as floats, anything else hashable"""
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, str):
+        text = value.strip()
+        return float(text) if NUMERIC_TEXT.fullmatch(text) else text
+    if isinstance(value, (int, float)):
+        value = float(value)
+        return value if math.isfinite(value) else repr(value)
+    return json.dumps(value, sort_keys=True)
+
+def sort_key(value):
+    # Total order over mixed cell types: numbers first, then everything else by its text
+    return (0, value, "") if isinstance(value, float) else (1, 0.0, str(value))
+
+def values_close(a, b, rel_tol: float, abs_tol: float) -> bool:
+    if isinstance(a, float) and isinstance(b, float):
+        return math.isclose(a, b, rel_tol=rel_tol, abs_tol=abs_tol)
+    return a == b
+
+def same_multiset(a: list, b: list, rel_tol: float, abs_tol: float) -> bool:
+    """True if two lists of values (or tuples of values) are equal as multisets within tolerance"""
+    if len(a) != len(b):
+        return False
+
+    def key(item):
+        return tuple(sort_key(v) for v in item) if isinstance(item, tuple) else sort_key(item)
+
+    for x, y in zip(sorted(a, key=key), sorted(b, key=key)):
+        pairs = zip(x, y) if isinstance(x, tuple) else ((x, y),)
+        if not all(values_close(p, q, rel_tol, abs_tol) for p, q in pairs):
+            return False
+    return True
+
+def compare_result_sets(inference_data: str, expected_data: str, rel_tol: float = 1e-6, abs_tol: float = 1e-9):
+    """
+    Decide clear-cut cases locally: True if every expected column is present in the inference
+    result (by name, or by matching values under another name) with the same multiset of rows
+    within numeric tolerance, False if the inference result is empty where rows were expected,
+    None when only a judge can tell (including any value-level difference)
+    """
+    try:
+        inference_rows = json.loads(inference_data)
+        expected_rows = json.loads(expected_data)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(inference_rows, list) or not isinstance(expected_rows, list):
+        return None
+    if not all(isinstance(r, dict) for r in inference_rows + expected_rows):
+        return None
+
+    if not expected_rows:
+        return True if not inference_rows else None
+    if not inference_rows:
+        return False
+    if len(inference_rows) != len(expected_rows):
+        return None
+
+    def columns(rows):
+        values = {}
+        for row in rows:
+            for name in row:
+                values.setdefault(name, None)
+        return {name: [normalize_value(row.get(name)) for row in rows] for name in values}
+
+    inference_columns = columns(inference_rows)
+    expected_columns = columns(expected_rows)
+    inference_by_name = {name.upper(): name for name in inference_columns}
+
+    # Match expected columns by name first, then by matching value multisets (renamed columns)
+    mapping = {}
+    unmatched = []
+    for name, values in expected_columns.items():
+        candidate = inference_by_name.get(name.upper())
+        if candidate is not None and same_multiset(inference_columns[candidate], values, rel_tol, abs_tol):
+            mapping[name] = candidate
+        else:
+            unmatched.append(name)
+    used = set(mapping.values())
+    for name in unmatched:
+        for candidate, values in inference_columns.items():
+            if candidate not in used and same_multiset(values, expected_columns[name], rel_tol, abs_tol):
+                mapping[name] = candidate
+                used.add(candidate)
+                break
+
+    if len(mapping) == len(expected_columns):
+        expected_order = list(expected_columns)
+        expected_tuples = list(zip(*(expected_columns[c] for c in expected_order)))
+        inference_tuples = list(zip(*(inference_columns[mapping[c]] for c in expected_order)))
+        if same_multiset(inference_tuples, expected_tuples, rel_tol, abs_tol):
+            return True
+
+    # Values differ (formats, precision, different answers): let the judge decide
+    return None
+
+class VerdictCache:
+    """Persistent cache of judge outputs keyed by model, question and result fingerprints"""
+    def __init__(self, session: Session, table_name: str, model: str):
+        self.session = session
+        self.table_name = table_name
+        self.model = model
+        self.entries = {}
+        self.looked_up = set()
+        self.pending = {}
+        self.hits = 0
+        if table_name:
+            session.sql(
+                f"CREATE TABLE IF NOT EXISTS {table_name} "
+                "(VERDICT_KEY STRING, MODEL STRING, JUDGE_OUTPUT STRING, UPDATED_AT TIMESTAMP_LTZ)"
+            ).collect()
 
-def main(session: Session, tbl_name: str, model_name: str) -> str:
+    def is_loaded(self, key: str) -> bool:
+        return not self.table_name or key in self.looked_up
+
+    def load(self, keys):
+        """Read the stored verdicts for keys not looked up yet, in one query"""
+        keys = {key for key in keys if not self.is_loaded(key)}
+        if not keys:
+            return
+        rows = fetch_by_keys(
+            self.session, self.table_name, "VERDICT_KEY", keys, ["VERDICT_KEY", "JUDGE_OUTPUT"],
+            F.col("MODEL") == self.model
+        )
+        for row in rows:
+            self.entries[row[0]] = row[1]
+        self.looked_up.update(keys)
+
+    def key(self, question: str, inference_data: str, expected_data: str) -> str:
+        return hash_text("|".join([
+            self.model, hash_text(question), hash_text(inference_data), hash_text(expected_data)
+        ]))
+
+    def get(self, key: str):
+        if not self.table_name:
+            return None
+        output = self.entries.get(key)
+        if output is not None:
+            self.hits += 1
+        return output
+
+    def put(self, key: str, judge_output: str):
+        if not self.table_name:
+            return
+        self.entries[key] = judge_output
+        self.looked_up.add(key)
+        self.pending[key] = (key, self.model, judge_output)
+
+    def flush(self):
+        if not self.pending:
+            return
+        source = self.session.create_dataframe(
+            list(self.pending.values()), schema=["VERDICT_KEY", "MODEL", "JUDGE_OUTPUT"]
+        )
+        target = self.session.table(self.table_name)
+        target.merge(
+            source,
+            target["VERDICT_KEY"] == source["VERDICT_KEY"],
+            [
+                F.when_matched().update({
+                    "JUDGE_OUTPUT": source["JUDGE_OUTPUT"],
+                    "UPDATED_AT": F.current_timestamp(),
+                }),
+                F.when_not_matched().insert({
+                    "VERDICT_KEY": source["VERDICT_KEY"],
+                    "MODEL": source["MODEL"],
+                    "JUDGE_OUTPUT": source["JUDGE_OUTPUT"],
+                    "UPDATED_AT": F.current_timestamp(),
+                }),
+            ],
+        )
+        self.pending.clear()
+
+class EvaluationContext:
+    """Settings and caches shared by every row of one evaluation run"""
+    def __init__(self, session: Session, model_name: str, total: int,
+                 result_cache: ResultCache, verdict_cache: VerdictCache):
+        self.session = session
+        self.model_name = model_name
+        self.total = total
+        self.result_cache = result_cache
+        self.verdict_cache = verdict_cache
+        self.identical = 0
+        self.compared = 0
+
+class RowEvaluation:
+    """Tracks one row through the result-query -> judge pipeline"""
+    def __init__(self, index: int, row):
+        self.index = index
+        self.question = row['QUESTION']
+        self.generated_sql = row['GENERATED_SQL']
+        self.expected_sql = row['EXPECTED_SQL']
+        self.inference_job = None
+        self.expected_job = None
+        self.expected_cached = False
+        self.judge_job = None
+        self.verdict_key = None
+        self.prompt = None
+        self.verdict = None
+        self.judge_output = None
+        self.status = None
+        self.message = None
+
+    def start(self, ctx: EvaluationContext):
+        self.inference_job = submit_sql_result(ctx.session, self.generated_sql)
+        cached = ctx.result_cache.get(self.expected_sql)
+        if cached is not None:
+            self.expected_job = AsyncValue(cached)
+            self.expected_cached = True
+        else:
+            self.expected_job = submit_sql_result(ctx.session, self.expected_sql)
+
+    def finish(self, ctx: EvaluationContext, judge_output: str, status: str) -> bool:
+        self.judge_output = judge_output
+        self.verdict = judge_output.strip().lower() == "true"
+        self.status = status
+        self.message = f"[{self.index}/{ctx.total}] Result: {judge_output}"
+        return True
+
+    def fail(self, ctx: EvaluationContext, status: str, message: str) -> bool:
+        self.status = status
+        self.message = f"[{self.index}/{ctx.total}] {message}"
+        return True
+
+    def needs_verdict_lookup(self, ctx: EvaluationContext) -> bool:
+        return self.judge_job is None and self.verdict_key is not None and \
+            not ctx.verdict_cache.is_loaded(self.verdict_key)
+
+    def advance(self, ctx: EvaluationContext) -> bool:
+        """Move to the next stage if the current one finished; returns True once the row is complete"""
+        if self.judge_job is None and self.verdict_key is None:
+            if not (self.inference_job.is_done() and self.expected_job.is_done()):
+                return False
+            inference_data = read_sql_result(self.inference_job)
+            expected_data = read_sql_result(self.expected_job)
+            if not self.expected_cached:
+                ctx.result_cache.put(self.expected_sql, expected_data)
+
+            # If there's an error in retrieving results, skip
+            if inference_data.startswith("Error") or expected_data.startswith("Error"):
+                return self.fail(ctx, "SKIPPED", "Skipped due to SQL error")
+
+            # Identical result sets (ignoring row order) need no judge
+            canonical_inference = canonical_result(inference_data)
+            canonical_expected = canonical_result(expected_data)
+            if canonical_inference is not None and canonical_inference == canonical_expected:
+                ctx.identical += 1
+                return self.finish(ctx, "True", "IDENTICAL")
+
+            # Clear matches (and empty results where rows were expected) are decided locally;
+            # any value-level difference still goes to the judge
+            decision = compare_result_sets(inference_data, expected_data)
+            if decision is not None:
+                ctx.compared += 1
+                return self.finish(ctx, str(decision), "COMPARATOR")
+
+            self.verdict_key = ctx.verdict_cache.key(
+                self.question,
+                canonical_inference or inference_data,
+                canonical_expected or expected_data
+            )
+            fstrings = {
+                "question": self.question,
+                "inference_data": inference_data,
+                "expected_data": expected_data,
+            }
+            self.prompt = SQLAccuracy_prompt.format(**fstrings)
+
+        if self.judge_job is None:
+            # Stored verdicts are looked up by the main loop, batched across rows
+            if not ctx.verdict_cache.is_loaded(self.verdict_key):
+                return False
+            cached = ctx.verdict_cache.get(self.verdict_key)
+            if cached is not None:
+                return self.finish(ctx, cached, "CACHED")
+            try:
+                self.judge_job = submit_sql_complete(ctx.session, ctx.model_name, self.prompt)
+            except Exception as e:
+                return self.fail(ctx, "CORTEX_ERROR", f"Cortex Error: {e}")
+            return False
+
+        if not self.judge_job.is_done():
+            return False
+        try:
+            result = self.judge_job.result()[0][0]
+        except Exception as e:
+            return self.fail(ctx, "CORTEX_ERROR", f"Cortex Error: {e}")
+        ctx.verdict_cache.put(self.verdict_key, result)
+        return self.finish(ctx, result, "EVALUATED")
+
+    def to_row(self) -> tuple:
+        return (self.index, self.question, self.generated_sql, self.expected_sql,
+                self.verdict, self.judge_output, self.status)
+
+def flush_verdicts(session: Session, rows: list, table_name: str):
+    if table_name and rows:
+        session.create_dataframe(rows, schema=VERDICT_COLUMNS).write.mode("append").save_as_table(table_name)
+    rows.clear()
+
+def main(session: Session, tbl_name: str, model_name: str, output_tbl: str = None,
+         max_concurrency: int = 8, result_cache_tbl: str = "EVAL_RESULT_CACHE",
+         verdict_cache_tbl: str = "EVAL_VERDICT_CACHE") -> str:
     if model_name is None:
         model_name = "llama3.1-70b"
+    max_concurrency = max(int(max_concurrency or 1), 1)
 
     # Load data from table
     df = session.table(tbl_name)
     rows = df.collect()
-    
+
     total = len(rows)
     true_count = 0
 
-    return_msg = ""
-
-    for i, row in enumerate(rows, 1):
-        question = row['QUESTION']
-        generated_sql = row['GENERATED_SQL']
-        expected_sql = row['EXPECTED_SQL']
-
-        inference_data = return_sql_result(session, generated_sql)
-        expected_data = return_sql_result(session, expected_sql)
-
-        # If there's an error in retrieving results, skip
-        if inference_data.startswith("Error") or expected_data.startswith("Error"):
-            return_msg += (f"[{i}/{total}] Skipped due to SQL error \n")
-            continue
-
-        fstrings = {
-            "question": question,
-            "inference_data": inference_data,
-            "expected_data": expected_data,
-        }
-        prompt = SQLAccuracy_prompt.format(**fstrings)
-
-        try:
-            result = run_async_sql_complete(session, model_name, prompt)
-            if result.strip().lower() == "true":
-                true_count += 1
-            return_msg += (f"[{i}/{total}] Result: {result}\n")
-        except Exception as e:
-            return_msg += (f"[{i}/{total}] Cortex Error: {e}\n")
-
+    result_cache = ResultCache(session, result_cache_tbl)
+    result_cache.prepare(row['EXPECTED_SQL'] for row in rows)
+    verdict_cache = VerdictCache(session, verdict_cache_tbl, model_name)
+    ctx = EvaluationContext(session, model_name, total, result_cache, verdict_cache)
+    messages = {}
+    verdict_rows = []
+
+    pending = iter(enumerate(rows, 1))
+    in_flight = []
+    exhausted = False
+
+    while in_flight or not exhausted:
+        # Top up the pipeline to max_concurrency rows
+        while not exhausted and len(in_flight) < max_concurrency:
+            item = next(pending, None)
+            if item is None:
+                exhausted = True
+                break
+            evaluation = RowEvaluation(*item)
+            evaluation.start(ctx)
+            in_flight.append(evaluation)
+
+        # Collect whichever rows finished, in completion order
+        still_running = []
+        for evaluation in in_flight:
+            if evaluation.advance(ctx):
+                messages[evaluation.index] = evaluation.message
+                if evaluation.verdict:
+                    true_count += 1
+                verdict_rows.append(evaluation.to_row())
+            else:
+                still_running.append(evaluation)
+        progressed = len(still_running) < len(in_flight)
+        in_flight = still_running
+
+        # Look up stored verdicts for every row that just reached the judge stage in one query
+        lookups = [evaluation.verdict_key for evaluation in in_flight if evaluation.needs_verdict_lookup(ctx)]
+        if lookups:
+            verdict_cache.load(lookups)
+            progressed = True
+
+        if len(verdict_rows) >= FLUSH_EVERY:
+            flush_verdicts(session, verdict_rows, output_tbl)
+        if in_flight and not progressed:
+            time.sleep(POLL_INTERVAL_SECONDS)
+
+    flush_verdicts(session, verdict_rows, output_tbl)
+    result_cache.flush()
+    verdict_cache.flush()
+
+    return_msg = "".join(f"{messages[i]}\n" for i in sorted(messages))
     accuracy = (true_count / total) * 100 if total > 0 else 0
+    if result_cache.hits:
+        return_msg += f"Expected results served from cache: {result_cache.hits}/{total}\n"
+    if ctx.identical or ctx.compared or verdict_cache.hits:
+        return_msg += (f"Judge calls skipped: {ctx.identical} identical result sets, "
+                       f"{ctx.compared} decided by comparator, {verdict_cache.hits} cached verdicts\n")
     return_msg += (f"Evaluation complete: {true_count}/{total} correct ({accuracy:.2f}%)")
     return return_msg
 $$;
 
-CALL evaluate_all_samples('EVAL_RESULTS', 'llama3.1-70b');
+CALL evaluate_all_samples('EVAL_RESULTS', 'llama3.1-70b', 'EVAL_VERDICTS', 8, 'EVAL_RESULT_CACHE', 'EVAL_VERDICT_CACHE');